@@ -1,14 +1,34 @@
+import importlib
 import streamlit as st
 from utils.helpers import get_base64_image, setup_headers
-# Correct import statements
-from pages.chat import chat_main
-from pages.evolution_days import evolution_days_main
-from pages.evolution_months import evolution_months_main
-from pages.holidays import holidays_main
-from pages.maps import maps_main
-from pages.trips import trips_main
-from pages.specific_trips import specific_trips_main
-from pages.weather import weather_main
+from utils.versioning import pin_dataset_version
+
+
+def lazy_page(module_name, function_name):
+    '''
+    Page callable that imports its module the first time the page is opened, so the Home page
+    does not pay for the imports and dataset loads of every other page.
+    Parameters:
+        module_name (str): Module of the page, e.g. 'pages.chat'.
+        function_name (str): Entry point of the page in that module.
+    Returns:
+        run_page (function): Callable for st.Page, named like the entry point so the page URL does not change.
+    '''
+    def run_page():
+        getattr(importlib.import_module(module_name), function_name)()
+
+    run_page.__name__ = function_name
+    return run_page
+
+
+chat_main = lazy_page('pages.chat', 'chat_main')
+evolution_days_main = lazy_page('pages.evolution_days', 'evolution_days_main')
+evolution_months_main = lazy_page('pages.evolution_months', 'evolution_months_main')
+holidays_main = lazy_page('pages.holidays', 'holidays_main')
+maps_main = lazy_page('pages.maps', 'maps_main')
+trips_main = lazy_page('pages.trips', 'trips_main')
+specific_trips_main = lazy_page('pages.specific_trips', 'specific_trips_main')
+weather_main = lazy_page('pages.weather', 'weather_main')
 
 
 @st.cache_data
@@ -157,6 +177,9 @@ def setup_pages():
     st.logo("files/logo.png", size='large', link="https://nexmove.streamlit.app")
     apply_background()
 
+    # Serve the whole run from one dataset version, a newer one is loaded in the background when the files change
+    pin_dataset_version()
+
     pages.run()
 
 
@@ -10,8 +10,7 @@ import plotly.graph_objects as go
 from typing import Optional
 from pydantic import BaseModel, Field
 from utils.helpers import load_dataset_chat
-
-DATA_simple_chat = load_dataset_chat()
+from utils.versioning import versioned
 
 
 class ChitchatChecker(BaseModel):
@@ -56,7 +55,7 @@ field_descriptions = {
     "origin_province_name": "The name of the origin province where the trip starts.",
     "destination_province_id": "The unique identifier for the destination province where the trip ends.",
     "destination_province_name": "The name of the destination province where the trip ends.",
-    "day": "The specific date when the trip occurred, in YYYY-MM-DD format.",
+    "day": "The specific date when the trip occurred, as a pandas datetime64 column (compare it with pd.Timestamp values or use the .dt accessor, not strings).",
     "day_of_week": "The day of the week when the trip occurred (e.g., Monday, Tuesday).",
     "origin_community": "The Spanin autonomic community which the origin province belongs.",
     "destination_community": "The Spanin autonomic community which the destination province belongs.",
@@ -93,16 +92,19 @@ def setup_llm_client(model: str):
     return llm
 
 
-@st.cache_resource
-def setup_pandasai_agent(_llm):
+@versioned(warm=())
+@st.cache_resource(max_entries=2)
+def setup_pandasai_agent(version, _llm):
     '''
-    Setup the PandasAI agent for the chatbot for performing data analysis tasks.
+    Setup the PandasAI agent for the chatbot for performing data analysis tasks, once per dataset version.
     Parameters:
+        version (str): Dataset version (injected, see versioned).
         _llm (ChatOpenAI): The client for the language model.
     Returns:
         agent (Agent): The PandasAI agent for the chatbot.
     '''
-    #  DATA_simple_chat = load_dataset_chat()
+    # Loaded here rather than at import, so importing this module does not read the chat dataset
+    DATA_simple_chat = load_dataset_chat.for_version(version)
     connector = PandasConnector(
         {"original_df": DATA_simple_chat},
         field_descriptions=field_descriptions
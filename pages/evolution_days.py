@@ -1,6 +1,47 @@
 import streamlit as st
-import pandas as pd
 from utils.helpers import load_dataset_main, setup_headers
+from utils.cube import rollup
+
+
+# Each panel is a fragment, so changing its selectbox only reruns that panel
+@st.fragment
+def origin_province_panel(origin_provinces, years):
+    selected_province = st.selectbox("Select Origin Province", origin_provinces)
+    weekly_travelers_origin = rollup(['year', 'day_of_week'], {'provincia_origen_name': selected_province})
+    st.write(f"<h4 style='text-align: center;'>Travelers by Day of the Week (Origin: {selected_province})</h4>", unsafe_allow_html=True)
+    for year in years:
+        year_data = weekly_travelers_origin[weekly_travelers_origin['year'] == year].set_index('day_of_week')
+        st.line_chart(year_data[['viajeros']])
+
+
+@st.fragment
+def destination_province_panel(destination_provinces, years):
+    selected_province_destino = st.selectbox("Select Destination Province", destination_provinces)
+    weekly_travelers_destino = rollup(['year', 'day_of_week'], {'provincia_destino_name': selected_province_destino})
+    st.write(f"<h4 style='text-align: center;'>Travelers by Day of the Week (Destination: {selected_province_destino})</h4>", unsafe_allow_html=True)
+    for year in years:
+        year_data = weekly_travelers_destino[weekly_travelers_destino['year'] == year].set_index('day_of_week')
+        st.line_chart(year_data[['viajeros']])
+
+
+@st.fragment
+def origin_community_panel(origin_communities, years):
+    selected_community = st.selectbox("Select Origin Autonomous Community", origin_communities)
+    weekly_travelers_origin_community = rollup(['year', 'day_of_week'], {'comunidad_origen': selected_community})
+    st.write(f"<h4 style='text-align: center;'>Travelers by Day of the Week (Origin Community: {selected_community})</h4>", unsafe_allow_html=True)
+    for year in years:
+        year_data = weekly_travelers_origin_community[weekly_travelers_origin_community['year'] == year].set_index('day_of_week')
+        st.line_chart(year_data[['viajeros']])
+
+
+@st.fragment
+def destination_community_panel(destination_communities, years):
+    selected_community_destino = st.selectbox("Select Destination Autonomous Community", destination_communities)
+    weekly_travelers_destino_community = rollup(['year', 'day_of_week'], {'comunidad_destino': selected_community_destino})
+    st.write(f"<h4 style='text-align: center;'>Travelers by Day of the Week (Destination Community: {selected_community_destino})</h4>", unsafe_allow_html=True)
+    for year in years:
+        year_data = weekly_travelers_destino_community[weekly_travelers_destino_community['year'] == year].set_index('day_of_week')
+        st.line_chart(year_data[['viajeros']])
 
 
 # Main function
@@ -14,12 +55,8 @@ def evolution_days_main():
     # Divider
     st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
 
-    # Ensure 'day_of_week' is properly categorized
-    day_of_week_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    DATA['day_of_week'] = pd.Categorical(DATA['day_of_week'], categories=day_of_week_order, ordered=True)
-
     # Aggregate travelers by year and day of the week
-    weekly_travelers = DATA.groupby(['year', 'day_of_week'])['viajeros'].sum().reset_index()
+    weekly_travelers = rollup(['year', 'day_of_week'])
 
     # Create a pivot table with 'day_of_week' as rows and years as columns
     pivoted_data = weekly_travelers.pivot(index='day_of_week', columns='year', values='viajeros')
@@ -49,22 +86,10 @@ def evolution_days_main():
     col1, col2 = st.columns(2)
 
     with col1:
-        selected_province = st.selectbox("Select Origin Province", origin_provinces)
-        province_data = DATA[DATA['provincia_origen_name'] == selected_province]
-        weekly_travelers_origin = province_data.groupby(['year', 'day_of_week'])['viajeros'].sum().reset_index()
-        st.write(f"<h4 style='text-align: center;'>Travelers by Day of the Week (Origin: {selected_province})</h4>", unsafe_allow_html=True)
-        for year in years:
-            year_data = weekly_travelers_origin[weekly_travelers_origin['year'] == year].set_index('day_of_week')
-            st.line_chart(year_data[['viajeros']])
+        origin_province_panel(origin_provinces, years)
 
     with col2:
-        selected_province_destino = st.selectbox("Select Destination Province", destination_provinces)
-        province_data_destino = DATA[DATA['provincia_destino_name'] == selected_province_destino]
-        weekly_travelers_destino = province_data_destino.groupby(['year', 'day_of_week'])['viajeros'].sum().reset_index()
-        st.write(f"<h4 style='text-align: center;'>Travelers by Day of the Week (Destination: {selected_province_destino})</h4>", unsafe_allow_html=True)
-        for year in years:
-            year_data = weekly_travelers_destino[weekly_travelers_destino['year'] == year].set_index('day_of_week')
-            st.line_chart(year_data[['viajeros']])
+        destination_province_panel(destination_provinces, years)
 
     st.divider()
 
@@ -77,19 +102,7 @@ def evolution_days_main():
     col3, col4 = st.columns(2)
 
     with col3:
-        selected_community = st.selectbox("Select Origin Autonomous Community", origin_communities)
-        community_data = DATA[DATA['comunidad_origen'] == selected_community]
-        weekly_travelers_origin_community = community_data.groupby(['year', 'day_of_week'])['viajeros'].sum().reset_index()
-        st.write(f"<h4 style='text-align: center;'>Travelers by Day of the Week (Origin Community: {selected_community})</h4>", unsafe_allow_html=True)
-        for year in years:
-            year_data = weekly_travelers_origin_community[weekly_travelers_origin_community['year'] == year].set_index('day_of_week')
-            st.line_chart(year_data[['viajeros']])
+        origin_community_panel(origin_communities, years)
 
     with col4:
-        selected_community_destino = st.selectbox("Select Destination Autonomous Community", destination_communities)
-        community_data_destino = DATA[DATA['comunidad_destino'] == selected_community_destino]
-        weekly_travelers_destino_community = community_data_destino.groupby(['year', 'day_of_week'])['viajeros'].sum().reset_index()
-        st.write(f"<h4 style='text-align: center;'>Travelers by Day of the Week (Destination Community: {selected_community_destino})</h4>", unsafe_allow_html=True)
-        for year in years:
-            year_data = weekly_travelers_destino_community[weekly_travelers_destino_community['year'] == year].set_index('day_of_week')
-            st.line_chart(year_data[['viajeros']])
+        destination_community_panel(destination_communities, years)
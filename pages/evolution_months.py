@@ -1,7 +1,48 @@
 import streamlit as st
 import numpy as np
-import pandas as pd
 from utils.helpers import setup_headers, load_dataset_main
+from utils.cube import rollup
+
+
+# Each panel is a fragment, so changing its selectbox only reruns that panel
+@st.fragment
+def origin_province_panel(origin_provinces, years):
+    selected_province = st.selectbox("Select Origin Province", origin_provinces)
+    monthly_travelers_origin = rollup(['year', 'month'], {'provincia_origen_name': selected_province})
+    st.write(f"<h4 style='text-align: center;'>Travelers per Month (Origin: {selected_province})</h4>", unsafe_allow_html=True)
+    for year in years:
+        year_data = monthly_travelers_origin[monthly_travelers_origin['year'] == year].set_index('month')
+        st.line_chart(year_data[['viajeros']])
+
+
+@st.fragment
+def destination_province_panel(destination_provinces, years):
+    selected_province_destino = st.selectbox("Select Destination Province", destination_provinces)
+    monthly_travelers_destino = rollup(['year', 'month'], {'provincia_destino_name': selected_province_destino})
+    st.write(f"<h4 style='text-align: center;'>Travelers per Month (Destination: {selected_province_destino})</h4>", unsafe_allow_html=True)
+    for year in years:
+        year_data = monthly_travelers_destino[monthly_travelers_destino['year'] == year].set_index('month')
+        st.line_chart(year_data[['viajeros']])
+
+
+@st.fragment
+def origin_community_panel(origin_communities, years):
+    selected_community = st.selectbox("Select Origin Autonomous Community", origin_communities)
+    monthly_travelers_origin_community = rollup(['year', 'month'], {'comunidad_origen': selected_community})
+    st.write(f"<h4 style='text-align: center;'>Travelers per Month (Origin Community: {selected_community})</h4>", unsafe_allow_html=True)
+    for year in years:
+        year_data = monthly_travelers_origin_community[monthly_travelers_origin_community['year'] == year].set_index('month')
+        st.line_chart(year_data[['viajeros']])
+
+
+@st.fragment
+def destination_community_panel(destination_communities, years):
+    selected_community_destino = st.selectbox("Select Destination Autonomous Community", destination_communities)
+    monthly_travelers_destino_community = rollup(['year', 'month'], {'comunidad_destino': selected_community_destino})
+    st.write(f"<h4 style='text-align: center;'>Travelers per Month (Destination Community: {selected_community_destino})</h4>", unsafe_allow_html=True)
+    for year in years:
+        year_data = monthly_travelers_destino_community[monthly_travelers_destino_community['year'] == year].set_index('month')
+        st.line_chart(year_data[['viajeros']])
 
 
 # Main function
@@ -15,11 +56,8 @@ def evolution_months_main():
     # Divider
     st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
 
-    # Ensure 'day' is in datetime format
-    DATA['day'] = pd.to_datetime(DATA['day'], errors='coerce')
-
     # Aggregate by year and month, then sum the 'viajeros' column
-    monthly_travelers = DATA.groupby(['year', 'month'])['viajeros'].sum().reset_index()
+    monthly_travelers = rollup(['year', 'month'])
 
     # Create a pivot table with 'month' as rows and 'year' as columns
     pivoted_data = monthly_travelers.pivot(index='month', columns='year', values='viajeros')
@@ -50,22 +88,10 @@ def evolution_months_main():
     col1, col2 = st.columns(2)
 
     with col1:
-        selected_province = st.selectbox("Select Origin Province", origin_provinces)
-        province_data = DATA[DATA['provincia_origen_name'] == selected_province]
-        monthly_travelers_origin = province_data.groupby(['year', 'month'])['viajeros'].sum().reset_index()
-        st.write(f"<h4 style='text-align: center;'>Travelers per Month (Origin: {selected_province})</h4>", unsafe_allow_html=True)
-        for year in years:
-            year_data = monthly_travelers_origin[monthly_travelers_origin['year'] == year].set_index('month')
-            st.line_chart(year_data[['viajeros']])
+        origin_province_panel(origin_provinces, years)
 
     with col2:
-        selected_province_destino = st.selectbox("Select Destination Province", destination_provinces)
-        province_data_destino = DATA[DATA['provincia_destino_name'] == selected_province_destino]
-        monthly_travelers_destino = province_data_destino.groupby(['year', 'month'])['viajeros'].sum().reset_index()
-        st.write(f"<h4 style='text-align: center;'>Travelers per Month (Destination: {selected_province_destino})</h4>", unsafe_allow_html=True)
-        for year in years:
-            year_data = monthly_travelers_destino[monthly_travelers_destino['year'] == year].set_index('month')
-            st.line_chart(year_data[['viajeros']])
+        destination_province_panel(destination_provinces, years)
 
     st.divider()
 
@@ -79,22 +105,10 @@ def evolution_months_main():
     col3, col4 = st.columns(2)
 
     with col3:
-        selected_community = st.selectbox("Select Origin Autonomous Community", origin_communities)
-        community_data = DATA[DATA['comunidad_origen'] == selected_community]
-        monthly_travelers_origin_community = community_data.groupby(['year', 'month'])['viajeros'].sum().reset_index()
-        st.write(f"<h4 style='text-align: center;'>Travelers per Month (Origin Community: {selected_community})</h4>", unsafe_allow_html=True)
-        for year in years:
-            year_data = monthly_travelers_origin_community[monthly_travelers_origin_community['year'] == year].set_index('month')
-            st.line_chart(year_data[['viajeros']])
+        origin_community_panel(origin_communities, years)
 
     with col4:
-        selected_community_destino = st.selectbox("Select Destination Autonomous Community", destination_communities)
-        community_data_destino = DATA[DATA['comunidad_destino'] == selected_community_destino]
-        monthly_travelers_destino_community = community_data_destino.groupby(['year', 'month'])['viajeros'].sum().reset_index()
-        st.write(f"<h4 style='text-align: center;'>Travelers per Month (Destination Community: {selected_community_destino})</h4>", unsafe_allow_html=True)
-        for year in years:
-            year_data = monthly_travelers_destino_community[monthly_travelers_destino_community['year'] == year].set_index('month')
-            st.line_chart(year_data[['viajeros']])
+        destination_community_panel(destination_communities, years)
 
 if __name__ == '__main__':
     main()
@@ -1,12 +1,77 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from utils.helpers import load_dataset_main, setup_headers
+from utils.helpers import setup_headers
+from utils.holidays import holiday_period, holiday_period_labels
+
+
+# Header, selectbox label and chart title of each kind of holiday period
+HOLIDAY_SECTIONS = {
+    'Christmas': ("Christmas Mobility Patterns", "Select Christmas Season", "Christmas Season {}"),
+    'Easter': ("Easter Mobility Patterns", "Select Easter", "Easter {}"),
+}
+
+
+# The period selectbox only reruns its own section, every period is precomputed
+@st.fragment
+def holiday_section(kind, default_period=None):
+    header, select_label, title = HOLIDAY_SECTIONS[kind]
+    st.header(header)
+
+    periods = holiday_period_labels(kind)
+    if not periods:
+        st.write(f"No data available for the {kind} periods.")
+        return
+
+    index = periods.index(default_period) if default_period in periods else 0
+    selected_period = st.selectbox(select_label, periods, index=index)
+    period_data = holiday_period(kind, selected_period)
+    period_title = title.format(selected_period)
+
+    if not period_data:
+        st.write(f"No data available for {period_title}.")
+        return
+
+    fig = px.bar(
+        period_data['daily'],
+        x='day',
+        y='viajeros',
+        title=f"Mobility Data for {period_title}",
+        labels={'day': 'Date', 'viajeros': 'Number of Travelers'}
+    )
+    fig.update_layout(xaxis_tickformat="%Y-%m-%d", xaxis_title="Date", yaxis_title="Number of Travelers")
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Breakdown by origin autonomous communities
+    st.subheader("Breakdown by Origin Autonomous Communities")
+    fig_origin = px.line(
+        period_data['origin'],
+        x='day',
+        y='viajeros',
+        color='comunidad_origen',
+        hover_data=['holiday'],
+        title=f"Origin Autonomous Community - {period_title}",
+        labels={'day': 'Date', 'viajeros': 'Number of Travelers', 'comunidad_origen': 'Origin Community', 'holiday': 'Holiday'}
+    )
+    fig_origin.update_layout(legend_title="Origin Community", xaxis_tickformat="%Y-%m-%d")
+    st.plotly_chart(fig_origin, use_container_width=True)
+
+    # Breakdown by destination autonomous communities
+    st.subheader("Breakdown by Destination Autonomous Communities")
+    fig_dest = px.line(
+        period_data['destination'],
+        x='day',
+        y='viajeros',
+        color='comunidad_destino',
+        hover_data=['holiday'],
+        title=f"Destination Autonomous Community - {period_title}",
+        labels={'day': 'Date', 'viajeros': 'Number of Travelers', 'comunidad_destino': 'Destination Community', 'holiday': 'Holiday'}
+    )
+    fig_dest.update_layout(legend_title="Destination Community", xaxis_tickformat="%Y-%m-%d")
+    st.plotly_chart(fig_dest, use_container_width=True)
 
 
 # Main function
 def holidays_main():
-    DATA = load_dataset_main()
     setup_headers()
 
     # Title and subtitle
@@ -16,131 +81,9 @@ def holidays_main():
     # Divider
     st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
 
-    # Verify that the DataFrame DATA is loaded and contains the 'day' column
-    if 'day' in DATA.columns:
-        DATA['day'] = pd.to_datetime(DATA['day'], errors='coerce')
-    else:
-        st.error("Error: The 'day' column is not found in the DataFrame DATA.")
-        st.stop()
-
-    # Christmas Analysis
-    st.header("Christmas Mobility Patterns")
-    christmas_periods = [("2022-12-23", "2023-01-07"), ("2023-12-23", "2024-01-07")]
-
-    filtered_data = pd.DataFrame()
-    for start_date, end_date in christmas_periods:
-        period_data = DATA[(DATA['day'] >= start_date) & (DATA['day'] <= end_date)]
-        filtered_data = pd.concat([filtered_data, period_data])
-
-    if not filtered_data.empty:
-        filtered_data['season'] = filtered_data['day'].apply(
-            lambda x: f"{x.year}-{x.year + 1}" if x.month == 12 else f"{x.year - 1}-{x.year}"
-        )
-
-        daily_travelers_christmas = filtered_data.groupby(['season', 'day'])['viajeros'].sum().reset_index()
-
-        seasons = daily_travelers_christmas['season'].unique()
-        selected_season = st.selectbox("Select Christmas Season", seasons)
-
-        season_data = daily_travelers_christmas[daily_travelers_christmas['season'] == selected_season]
-
-        fig = px.bar(
-            season_data,
-            x='day',
-            y='viajeros',
-            title=f"Mobility Data for Christmas Season {selected_season}",
-            labels={'day': 'Date', 'viajeros': 'Number of Travelers'}
-        )
-        fig.update_layout(xaxis_tickformat="%Y-%m-%d", xaxis_title="Date", yaxis_title="Number of Travelers")
-        st.plotly_chart(fig, use_container_width=True)
-
-        # Breakdown by origin autonomous communities
-        st.subheader("Breakdown by Origin Autonomous Communities")
-        origin_data = filtered_data[filtered_data['season'] == selected_season].groupby(
-            ['comunidad_origen', 'day'])['viajeros'].sum().reset_index()
-
-        fig_origin = px.line(
-            origin_data,
-            x='day',
-            y='viajeros',
-            color='comunidad_origen',
-            title=f"Origin Autonomous Community - Christmas Season {selected_season}",
-            labels={'day': 'Date', 'viajeros': 'Number of Travelers', 'comunidad_origen': 'Origin Community'}
-        )
-        fig_origin.update_layout(legend_title="Origin Community", xaxis_tickformat="%Y-%m-%d")
-        st.plotly_chart(fig_origin, use_container_width=True)
-
-        # Breakdown by destination autonomous communities
-        st.subheader("Breakdown by Destination Autonomous Communities")
-        dest_data = filtered_data[filtered_data['season'] == selected_season].groupby(
-            ['comunidad_destino', 'day'])['viajeros'].sum().reset_index()
-
-        fig_dest = px.line(
-            dest_data,
-            x='day',
-            y='viajeros',
-            color='comunidad_destino',
-            title=f"Destination Autonomous Community - Christmas Season {selected_season}",
-            labels={'day': 'Date', 'viajeros': 'Number of Travelers', 'comunidad_destino': 'Destination Community'}
-        )
-        fig_dest.update_layout(legend_title="Destination Community", xaxis_tickformat="%Y-%m-%d")
-        st.plotly_chart(fig_dest, use_container_width=True)
-    else:
-        st.write("No data available for the selected Christmas periods.")
-
-    # Easter Analysis
-    st.header("Easter Mobility Patterns")
-    easter_start, easter_end = "2023-04-02", "2023-04-09"
-    filtered_data_easter = DATA[(DATA['day'] >= easter_start) & (DATA['day'] <= easter_end)]
-
-    if not filtered_data_easter.empty:
-        filtered_data_easter['season'] = "Easter 2023"
-        daily_travelers_easter = filtered_data_easter.groupby(['season', 'day'])['viajeros'].sum().reset_index()
-
-        # Main bar chart for Easter
-        fig = px.bar(
-            daily_travelers_easter,
-            x='day',
-            y='viajeros',
-            title="Mobility Data for Easter 2023",
-            labels={'day': 'Date', 'viajeros': 'Number of Travelers'}
-        )
-        fig.update_layout(xaxis_tickformat="%Y-%m-%d", xaxis_title="Date", yaxis_title="Number of Travelers")
-        st.plotly_chart(fig, use_container_width=True)
-
-        # Breakdown by origin autonomous communities
-        st.subheader("Breakdown by Origin Autonomous Communities")
-        origin_data_easter = filtered_data_easter.groupby(
-            ['comunidad_origen', 'day'])['viajeros'].sum().reset_index()
-
-        fig_origin = px.line(
-            origin_data_easter,
-            x='day',
-            y='viajeros',
-            color='comunidad_origen',
-            title="Origin Autonomous Community - Easter 2023",
-            labels={'day': 'Date', 'viajeros': 'Number of Travelers', 'comunidad_origen': 'Origin Community'}
-        )
-        fig_origin.update_layout(legend_title="Origin Community", xaxis_tickformat="%Y-%m-%d")
-        st.plotly_chart(fig_origin, use_container_width=True)
-
-        # Breakdown by destination autonomous communities
-        st.subheader("Breakdown by Destination Autonomous Communities")
-        dest_data_easter = filtered_data_easter.groupby(
-            ['comunidad_destino', 'day'])['viajeros'].sum().reset_index()
-
-        fig_dest = px.line(
-            dest_data_easter,
-            x='day',
-            y='viajeros',
-            color='comunidad_destino',
-            title="Destination Autonomous Community - Easter 2023",
-            labels={'day': 'Date', 'viajeros': 'Number of Travelers', 'comunidad_destino': 'Destination Community'}
-        )
-        fig_dest.update_layout(legend_title="Destination Community", xaxis_tickformat="%Y-%m-%d")
-        st.plotly_chart(fig_dest, use_container_width=True)
-    else:
-        st.write("No data available for Easter 2023 period.")
+    holiday_section('Christmas')
+
+    holiday_section('Easter', default_period='2023')
 
 
 if __name__ == "__main__":
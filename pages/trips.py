@@ -1,30 +1,28 @@
 import streamlit as st
 import pandas as pd
-from utils.helpers import load_dataset_main, setup_headers
+from utils.downsample import MAX_CHART_POINTS, downsample_series
+from utils.helpers import setup_headers
+from utils.tensor import load_prefix_index
 
 
-# Main function
-def trips_main():
-    DATA = load_dataset_main()
-    setup_headers()
-
-    # Title and subtitle
-    st.markdown("<h1 class='main-title'>NexMove: Mobility Data at Your Fingertips</h1>", unsafe_allow_html=True)
-    st.markdown("<h2 class='subtitle'>Interactive Data Analysis</h2>", unsafe_allow_html=True)
-
-    # Divider
-    st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
+def daily_bar_chart(daily_travelers):
+    # Long periods are summed into weeks or months, so the chart never gets more than MAX_CHART_POINTS bars
+    chart_data, resolution = downsample_series(daily_travelers, MAX_CHART_POINTS)
+    chart_data.index = chart_data.index.strftime('%Y-%m-%d')
+    if resolution != 'daily':
+        st.caption(f"{resolution.capitalize()} totals, each bar starts on the date shown. "
+                   "Incomplete periods at either end of the range are not shown.")
+    st.bar_chart(chart_data)
 
-    # Verify that the DataFrame DATA is loaded and contains the 'day' column
-    if 'day' in DATA.columns:
-        DATA['day'] = pd.to_datetime(DATA['day'], errors='coerce')
-    else:
-        st.error("Error: The 'day' column is not found in the DataFrame DATA.")
-        st.stop()
 
+# Each section is a fragment, so its widgets only rerun that section instead of the whole page
+@st.fragment
+def origin_province_section():
     # Analysis for Origin Province
     st.write("### Select Origin Province for Mobility Analysis")
-    provinces = DATA['provincia_origen_name'].unique()
+    # Options and slices come from the prefix sums, no scan of the dataset
+    index_origin_province = load_prefix_index('province', 'origin')
+    provinces = index_origin_province.active_zones()
     selected_province = st.selectbox("Select Province", provinces)
 
     st.write("### Select a Time Period for Origin Province")
@@ -41,28 +39,24 @@ def trips_main():
         key="end_date_origin_province"
     )
 
-    filtered_data_origin_province = DATA[
-        (DATA['provincia_origen_name'] == selected_province) &
-        (DATA['day'] >= pd.to_datetime(start_date_origin_province)) &
-        (DATA['day'] <= pd.to_datetime(end_date_origin_province))
-    ]
-
-    if not filtered_data_origin_province.empty:
-        daily_travelers_origin_province = filtered_data_origin_province.groupby('day')['viajeros'].sum().reset_index()
-        daily_travelers_origin_province['day'] = daily_travelers_origin_province['day'].dt.strftime('%Y-%m-%d')
+    daily_travelers_origin_province = index_origin_province.range_daily(selected_province, start_date_origin_province, end_date_origin_province)
+    total_travelers_origin_province = index_origin_province.range_total(selected_province, start_date_origin_province, end_date_origin_province)
 
+    if daily_travelers_origin_province.any():
         st.write(f"## Mobility Data for {selected_province} (Origin)")
-        daily_travelers_origin_province.set_index('day', inplace=True)
-        st.bar_chart(daily_travelers_origin_province['viajeros'])
+        st.metric("Total travelers in the period", f"{total_travelers_origin_province:,}")
+        daily_bar_chart(daily_travelers_origin_province)
     else:
         st.write("No data available for the selected origin province and date range.")
 
-    # Divider
-    st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
 
+@st.fragment
+def destination_province_section():
     # Analysis for Destination Province
     st.write("### Select Destination Province for Mobility Analysis")
-    destination_provinces = DATA['provincia_destino_name'].unique()
+    # Options and slices come from the prefix sums, no scan of the dataset
+    index_dest_province = load_prefix_index('province', 'destination')
+    destination_provinces = index_dest_province.active_zones()
     selected_province_dest = st.selectbox("Select Destination Province", destination_provinces)
 
     st.write("### Select a Time Period for Destination Province")
@@ -79,28 +73,24 @@ def trips_main():
         key="end_date_dest_province"
     )
 
-    filtered_data_dest_province = DATA[
-        (DATA['provincia_destino_name'] == selected_province_dest) &
-        (DATA['day'] >= pd.to_datetime(start_date_dest_province)) &
-        (DATA['day'] <= pd.to_datetime(end_date_dest_province))
-    ]
-
-    if not filtered_data_dest_province.empty:
-        daily_travelers_dest_province = filtered_data_dest_province.groupby('day')['viajeros'].sum().reset_index()
-        daily_travelers_dest_province['day'] = daily_travelers_dest_province['day'].dt.strftime('%Y-%m-%d')
+    daily_travelers_dest_province = index_dest_province.range_daily(selected_province_dest, start_date_dest_province, end_date_dest_province)
+    total_travelers_dest_province = index_dest_province.range_total(selected_province_dest, start_date_dest_province, end_date_dest_province)
 
+    if daily_travelers_dest_province.any():
         st.write(f"## Mobility Data for {selected_province_dest} (Destination)")
-        daily_travelers_dest_province.set_index('day', inplace=True)
-        st.bar_chart(daily_travelers_dest_province['viajeros'])
+        st.metric("Total travelers in the period", f"{total_travelers_dest_province:,}")
+        daily_bar_chart(daily_travelers_dest_province)
     else:
         st.write("No data available for the selected destination province and date range.")
 
-    # Divider
-    st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
 
+@st.fragment
+def origin_community_section():
     # Autonomous Community Analysis
     st.write("### Select Origin Autonomous Community for Mobility Analysis")
-    origin_communities = DATA['comunidad_origen'].unique()
+    # Options and slices come from the prefix sums, no scan of the dataset
+    index_origin_community = load_prefix_index('community', 'origin')
+    origin_communities = index_origin_community.active_zones()
     selected_origin_community = st.selectbox("Select Origin Autonomous Community", origin_communities)
 
     st.write("### Select a Time Period for Destination Autonomous Community")
@@ -117,27 +107,23 @@ def trips_main():
         key="end_date_origin_community"
     )
 
-    filtered_data_origin_community = DATA[
-        (DATA['comunidad_origen'] == selected_origin_community) &
-        (DATA['day'] >= pd.to_datetime(start_date_origin_community)) &
-        (DATA['day'] <= pd.to_datetime(end_date_origin_community))
-    ]
-
-    if not filtered_data_origin_community.empty:
-        daily_travelers_origin_community = filtered_data_origin_community.groupby('day')['viajeros'].sum().reset_index()
-        daily_travelers_origin_community['day'] = daily_travelers_origin_community['day'].dt.strftime('%Y-%m-%d')
+    daily_travelers_origin_community = index_origin_community.range_daily(selected_origin_community, start_date_origin_community, end_date_origin_community)
+    total_travelers_origin_community = index_origin_community.range_total(selected_origin_community, start_date_origin_community, end_date_origin_community)
 
+    if daily_travelers_origin_community.any():
         st.write(f"## Mobility Data for {selected_origin_community} (Origin)")
-        daily_travelers_origin_community.set_index('day', inplace=True)
-        st.bar_chart(daily_travelers_origin_community['viajeros'])
+        st.metric("Total travelers in the period", f"{total_travelers_origin_community:,}")
+        daily_bar_chart(daily_travelers_origin_community)
     else:
         st.write("No data available for the selected origin autonomous community and date range.")
 
-    # Divider
-    st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
 
+@st.fragment
+def destination_community_section():
     st.write("### Select Destination Autonomous Community for Mobility Analysis")
-    destination_communities = DATA['comunidad_destino'].unique()
+    # Options and slices come from the prefix sums, no scan of the dataset
+    index_destination_community = load_prefix_index('community', 'destination')
+    destination_communities = index_destination_community.active_zones()
     selected_destination_community = st.selectbox("Select Destination Autonomous Community", destination_communities)
 
     st.write("### Select a Time Period for Destination Autonomous Community")
@@ -154,18 +140,41 @@ def trips_main():
         key="end_date_destination_community"
     )
 
-    filtered_data_destination_community = DATA[
-        (DATA['comunidad_origen'] == selected_destination_community) &
-        (DATA['day'] >= pd.to_datetime(start_date_destination_community)) &
-        (DATA['day'] <= pd.to_datetime(end_date_destination_community))
-    ]
-
-    if not filtered_data_destination_community.empty:
-        daily_travelers_destination_community = filtered_data_destination_community.groupby('day')['viajeros'].sum().reset_index()
-        daily_travelers_destination_community['day'] = daily_travelers_destination_community['day'].dt.strftime('%Y-%m-%d')
+    daily_travelers_destination_community = index_destination_community.range_daily(selected_destination_community, start_date_destination_community, end_date_destination_community)
+    total_travelers_destination_community = index_destination_community.range_total(selected_destination_community, start_date_destination_community, end_date_destination_community)
 
+    if daily_travelers_destination_community.any():
         st.write(f"## Mobility Data for {selected_destination_community} (Destination)")
-        daily_travelers_destination_community.set_index('day', inplace=True)
-        st.bar_chart(daily_travelers_destination_community['viajeros'])
+        st.metric("Total travelers in the period", f"{total_travelers_destination_community:,}")
+        daily_bar_chart(daily_travelers_destination_community)
     else:
         st.write("No data available for the selected destination autonomous community and date range.")
+
+
+# Main function
+def trips_main():
+    setup_headers()
+
+    # Title and subtitle
+    st.markdown("<h1 class='main-title'>NexMove: Mobility Data at Your Fingertips</h1>", unsafe_allow_html=True)
+    st.markdown("<h2 class='subtitle'>Interactive Data Analysis</h2>", unsafe_allow_html=True)
+
+    # Divider
+    st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
+
+    origin_province_section()
+
+    # Divider
+    st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
+
+    destination_province_section()
+
+    # Divider
+    st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
+
+    origin_community_section()
+
+    # Divider
+    st.markdown("<div class='divider'></div>", unsafe_allow_html=True)
+
+    destination_community_section()
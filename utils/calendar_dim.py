@@ -0,0 +1,153 @@
+import datetime
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.versioning import versioned
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+DAY_OF_WEEK_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+SEASON_NAMES = ['Winter', 'Spring', 'Summer', 'Autumn']
+
+# Holidays on the same date every year in the whole country: (month, day, name)
+NATIONAL_HOLIDAYS = [
+    (1, 1, "New Year's Day"),
+    (1, 6, 'Epiphany'),
+    (5, 1, 'Labour Day'),
+    (8, 15, 'Assumption of Mary'),
+    (10, 12, 'National Day'),
+    (11, 1, "All Saints' Day"),
+    (12, 6, 'Constitution Day'),
+    (12, 8, 'Immaculate Conception'),
+    (12, 25, 'Christmas Day'),
+]
+
+# Christmas season: from December 23 to January 7 of the next year
+CHRISTMAS_START = (12, 23)
+CHRISTMAS_END = (1, 7)
+
+
+def easter_sunday(year):
+    '''
+    Date of Easter Sunday in the Gregorian calendar (anonymous Gregorian computus).
+    Parameters:
+        year (int): Year.
+    Returns:
+        easter (datetime.date): Easter Sunday of the year.
+    '''
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+
+def day_key(days):
+    '''
+    Integer key of some days, as YYYYMMDD.
+    Parameters:
+        days (pd.Series | pd.DatetimeIndex): Days.
+    Returns:
+        keys (np.ndarray): int32 key of every day.
+    '''
+    days = pd.DatetimeIndex(days)
+    return (days.year * 10000 + days.month * 100 + days.day).to_numpy(dtype=np.int32)
+
+
+def build_calendar(start, end):
+    '''
+    Calendar dimension: the attributes of every day between two dates, computed once for the whole range.
+    Parameters:
+        start (date): First day.
+        end (date): Last day.
+    Returns:
+        calendar (pd.DataFrame): One row per day indexed by its day key (see day_key) with 'day', 'year',
+        'month', 'month_number', 'day_of_week', 'weekday' (0 is Monday), 'iso_week', 'day_number', 'season',
+        'christmas_season' (e.g. '2022-2023', None outside Christmas), 'national_holiday' (name, None on the
+        other days) and the flags 'is_weekend', 'is_national_holiday', 'is_christmas' and 'is_holy_week'
+        (Palm Sunday to Easter Sunday).
+    '''
+    days = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq='D')
+    years = days.year.to_numpy()
+    months = days.month.to_numpy()
+    day_numbers = days.day.to_numpy()
+    weekdays = days.weekday.to_numpy()
+
+    # Month and day as MMDD, so fixed dates are compared as integers
+    month_days = months * 100 + day_numbers
+
+    # Name of the national holiday of every day, None on the other days
+    national_holiday = pd.Series(month_days).map({month * 100 + day: name for month, day, name in NATIONAL_HOLIDAYS})
+    national_holiday = national_holiday.to_numpy(dtype=object)
+    easters = pd.DatetimeIndex([easter_sunday(year) for year in years])
+    until_easter = ((easters - days) // pd.Timedelta(days=1)).to_numpy()
+    national_holiday[until_easter == 2] = 'Good Friday'
+    is_national_holiday = pd.notna(national_holiday)
+    national_holiday[~is_national_holiday] = None
+
+    christmas_start = CHRISTMAS_START[0] * 100 + CHRISTMAS_START[1]
+    christmas_end = CHRISTMAS_END[0] * 100 + CHRISTMAS_END[1]
+    christmas = (month_days >= christmas_start) | (month_days <= christmas_end)
+    first_year = np.where(months == 12, years, years - 1)
+    season_labels = pd.Series(first_year).astype(str) + '-' + pd.Series(first_year + 1).astype(str)
+    christmas_season = np.where(christmas, season_labels.to_numpy(), None)
+
+    # Meteorological seasons: December to February is winter
+    season = (months % 12) // 3
+
+    calendar = pd.DataFrame({
+        'day': days,
+        'year': years.astype(np.int16),
+        'month': pd.Categorical.from_codes(months - 1, categories=MONTH_NAMES, ordered=True),
+        'month_number': months.astype(np.int8),
+        'day_of_week': pd.Categorical.from_codes(weekdays, categories=DAY_OF_WEEK_NAMES, ordered=True),
+        'weekday': weekdays.astype(np.int8),
+        'iso_week': days.isocalendar().week.to_numpy(dtype=np.int8),
+        'day_number': day_numbers.astype(np.int8),
+        'season': pd.Categorical.from_codes(season, categories=SEASON_NAMES, ordered=True),
+        'christmas_season': christmas_season,
+        'national_holiday': national_holiday,
+        'is_weekend': weekdays >= 5,
+        'is_national_holiday': is_national_holiday,
+        'is_christmas': christmas,
+        'is_holy_week': (until_easter >= 0) & (until_easter <= 7),
+    }, index=pd.Index(day_key(days), name='day_key'))
+    return calendar
+
+
+def calendar_columns(days, columns):
+    '''
+    Attributes of some days, joined from the calendar dimension by day key.
+    Parameters:
+        days (pd.Series): Days, e.g. the 'day' column of a dataset.
+        columns (list): Calendar columns to return (see build_calendar).
+    Returns:
+        attributes (pd.DataFrame): One row per day with the requested columns, aligned with `days`.
+    '''
+    if days.empty:
+        return pd.DataFrame(columns=columns, index=days.index)
+
+    calendar = build_calendar(days.min(), days.max())
+    positions = calendar.index.get_indexer(day_key(days))
+    return calendar[columns].iloc[positions].set_axis(days.index)
+
+
+@versioned()
+@st.cache_resource(max_entries=2)
+def load_calendar(version):
+    # Calendar of every day covered by the main dataset, built once per dataset version. It has one more day
+    # on each side, so the holiday periods cut by the ends of the data can be told apart (see utils.holidays)
+    # (imported here, the dataset loaders themselves use the calendar)
+    from utils.helpers import load_dataset_main
+
+    days = load_dataset_main.for_version(version)['day']
+    one_day = pd.Timedelta(days=1)
+    return build_calendar(days.min() - one_day, days.max() + one_day)
@@ -0,0 +1,112 @@
+from functools import partial
+import duckdb
+import pandas as pd
+import streamlit as st
+from utils.helpers import concat_partitions, freeze_dataset, load_partition_aggregates, main_partition_names
+from utils.result_cache import cached_result
+from utils.versioning import versioned
+
+# Calendar breakdown shared by every rollup
+CALENDAR_COLUMNS = ['year', 'month', 'day_of_week']
+
+# Rollups precomputed for every partition, from the smallest to the largest. Each one keeps the sum of
+# 'viajeros' and the number of rows behind it, so averages can be rebuilt from the rollup too.
+CUBOIDS = [
+    CALENDAR_COLUMNS,
+    ['comunidad_origen', *CALENDAR_COLUMNS],
+    ['comunidad_destino', *CALENDAR_COLUMNS],
+    ['provincia_origen_name', *CALENDAR_COLUMNS],
+    ['provincia_destino', 'provincia_destino_name', *CALENDAR_COLUMNS],
+    ['provincia_destino', 'day'],
+]
+
+
+def build_cuboid(DATA, columns):
+    '''
+    Sum of 'viajeros' and number of rows of a DataFrame grouped by some columns.
+    Parameters:
+        DATA (pd.DataFrame): Rows of the main dataset, e.g. one partition.
+        columns (list): Columns to group by.
+    Returns:
+        cuboid (pd.DataFrame): One row per group with `columns`, 'viajeros' and 'n_rows'.
+    '''
+    group_columns = ", ".join(f'"{column}"' for column in columns)
+    connection = duckdb.connect()
+    try:
+        connection.register('partition', DATA)
+        cuboid = connection.execute(
+            f'SELECT {group_columns}, SUM("viajeros")::BIGINT AS viajeros, COUNT(*) AS n_rows '
+            f'FROM partition GROUP BY {group_columns}'
+        ).df()
+    finally:
+        connection.close()
+
+    # Keep the same categories as the partition so filters and sorting behave the same
+    for column in columns:
+        if isinstance(DATA[column].dtype, pd.CategoricalDtype):
+            cuboid[column] = pd.Categorical(cuboid[column], dtype=DATA[column].dtype)
+    return cuboid
+
+
+# Aggregate name -> builder, used to store the cuboids of every partition
+CUBE_BUILDERS = {f"cube_{'-'.join(columns)}": partial(build_cuboid, columns=columns) for columns in CUBOIDS}
+
+
+@versioned()
+@st.cache_resource(max_entries=2)
+def load_cube(version):
+    '''
+    Merge the cuboids of every partition, only the partitions without stored cuboids are scanned.
+    Parameters:
+        version (str): Dataset version (see utils.versioning), filled in for callers.
+    Returns:
+        cube (list): (columns, DataFrame) pairs, in the same order as CUBOIDS.
+    '''
+    partitions = [load_partition_aggregates(name, CUBE_BUILDERS)[0] for name in main_partition_names()]
+
+    cube = []
+    for (aggregate, _), columns in zip(CUBE_BUILDERS.items(), CUBOIDS):
+        # Each cuboid keeps the categories of its partition (see build_cuboid), so unifying them like the
+        # partitions of the main dataset gives the same dtypes without loading it
+        cuboid = concat_partitions([partition[aggregate] for partition in partitions])
+
+        # Sums and counts are additive, so groups present in several partitions are summed
+        cuboid = cuboid.groupby(columns, observed=True)[['viajeros', 'n_rows']].sum().reset_index()
+        cube.append((columns, cuboid))
+    return cube
+
+
+# Every selectbox change of the Evolution pages asks for one of these, keyed by the version and the arguments
+@cached_result(max_entries=256)
+def rollup(version, by, filters=None, agg='sum'):
+    '''
+    Answer an aggregation of 'viajeros' from the smallest precomputed rollup that covers it.
+    Parameters:
+        version (str): Dataset version (see utils.versioning), filled in for callers.
+        by (list): Columns to group by.
+        filters (dict): Column -> value to keep (equality).
+        agg (str): 'sum' for totals or 'mean' for the average per row of the main dataset.
+    Returns:
+        result (pd.DataFrame): One row per group with the columns of `by` plus 'viajeros', sorted by `by`.
+    '''
+    filters = filters or {}
+    needed = set(by) | set(filters)
+    for columns, cuboid in load_cube.for_version(version):
+        if needed <= set(columns):
+            break
+    else:
+        raise ValueError(f"No rollup covers the columns {sorted(needed)}")
+
+    mask = pd.Series(True, index=cuboid.index)
+    for column, value in filters.items():
+        if column == 'day':
+            value = pd.Timestamp(value)
+        mask &= cuboid[column] == value
+
+    result = cuboid[mask].groupby(by, observed=True)[['viajeros', 'n_rows']].sum()
+    if agg == 'mean':
+        result['viajeros'] = result['viajeros'] / result['n_rows']
+
+    # groupby does not sort categorical keys when grouping by several columns with observed=True
+    # Shared by every session asking for the same rollup
+    return freeze_dataset(result[['viajeros']].reset_index().sort_values(by, ignore_index=True))
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+# Most points sent to the browser by a time-series chart
+MAX_CHART_POINTS = 400
+
+# Coarser resolutions tried in order when a daily series has too many points: (name, pandas frequency)
+RESOLUTIONS = [
+    ('weekly', 'W-MON'),
+    ('monthly', 'MS'),
+]
+
+
+def lttb_indices(x, y, n_out):
+    '''
+    Positions of the points kept by Largest-Triangle-Three-Buckets, which preserves the visual shape of a line.
+    Parameters:
+        x (np.ndarray): Increasing x values.
+        y (np.ndarray): y values.
+        n_out (int): Number of points to keep, the first and last point included.
+    Returns:
+        positions (np.ndarray): Sorted positions of the kept points.
+    '''
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # n_out - 2 buckets between the first and the last point, each one keeps a point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    positions = np.empty(n_out, dtype=np.int64)
+    positions[0], positions[-1] = 0, n - 1
+
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        average_x, average_y = x[end:next_end].mean(), y[end:next_end].mean()
+
+        # Point of the bucket forming the largest triangle with the previous kept point and the next bucket average
+        previous = positions[bucket]
+        areas = np.abs(
+            (x[previous] - average_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (average_y - y[previous])
+        )
+        positions[bucket + 1] = start + areas.argmax()
+    return positions
+
+
+def minmax_indices(y, n_out):
+    '''
+    Positions of the minimum and maximum of evenly sized buckets, which keeps every peak and dip.
+    Parameters:
+        y (np.ndarray): y values.
+        n_out (int): Maximum number of points to keep (two per bucket).
+    Returns:
+        positions (np.ndarray): Sorted positions of the kept points.
+    '''
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(int)
+    positions = [
+        start + index
+        for start, end in zip(edges[:-1], edges[1:])
+        for index in (y[start:end].argmin(), y[start:end].argmax())
+    ]
+    return np.unique(positions)
+
+
+def pick_points(x, y, n_out, method):
+    # Positions kept by one of the point picking methods
+    if method == 'lttb':
+        return lttb_indices(x, y, n_out)
+    if method == 'minmax':
+        return minmax_indices(y, n_out)
+    raise ValueError(f"Unknown downsampling method '{method}'")
+
+
+def complete_buckets(series, frequency):
+    '''
+    Sums of a daily series over calendar periods, leaving out the first and last period when the series
+    only covers part of them, so the edges of the chart do not show artificial dips.
+    Parameters:
+        series (pd.Series): Values indexed by day, without gaps.
+        frequency (str): pandas frequency of the periods, e.g. 'W-MON'.
+    Returns:
+        sums (pd.Series): Total of every period kept, indexed by its first day.
+    '''
+    buckets = series.resample(frequency, label='left', closed='left')
+    sums, days = buckets.sum(), buckets.count()
+
+    # Days of each period, from its first day to the first day of the next one
+    period_days = ((sums.index + to_offset(frequency)) - sums.index).days
+    partial = days.to_numpy() < period_days.to_numpy()
+    partial[1:-1] = False
+    return sums[~partial]
+
+
+def downsample_series(series, max_points=MAX_CHART_POINTS, method='resample'):
+    '''
+    Bound the number of points of a daily series before charting it.
+    Parameters:
+        series (pd.Series): Values indexed by day.
+        max_points (int): Maximum number of points to return.
+        method (str): 'resample' sums the days into weeks or months (the first one that fits, see
+        complete_buckets), 'lttb' or 'minmax' keep some of the daily points.
+    Returns:
+        series (pd.Series): Series with at most `max_points` points.
+        resolution (str): 'daily' when the series was small enough, otherwise 'weekly', 'monthly' or the method.
+    '''
+    if len(series) <= max_points:
+        return series, 'daily'
+
+    if method == 'resample':
+        for resolution, frequency in RESOLUTIONS:
+            coarse = complete_buckets(series, frequency)
+            if len(coarse) <= max_points:
+                return coarse, resolution
+        # Even the coarsest resolution is too long, keep its extremes
+        return coarse.iloc[minmax_indices(coarse.to_numpy(), max_points)], resolution
+
+    x = series.index.to_numpy(dtype='datetime64[D]').astype(np.int64)
+    return series.iloc[pick_points(x, series.to_numpy(), max_points, method)], method
+
+
+def downsample_frame(df, x_field, y_field, max_points=MAX_CHART_POINTS, method='lttb'):
+    '''
+    Bound the number of rows of a chart's data by keeping some of its points, with all their columns.
+    Parameters:
+        df (pd.DataFrame): Chart data sorted by `x_field`.
+        x_field (str): Date column on the x axis.
+        y_field (str): Column on the y axis.
+        max_points (int): Maximum number of rows to return.
+        method (str): 'lttb' or 'minmax'.
+    Returns:
+        df (pd.DataFrame): Rows kept, in their original order.
+    '''
+    if len(df) <= max_points:
+        return df
+
+    x = pd.to_datetime(df[x_field]).to_numpy(dtype='datetime64[D]').astype(np.int64)
+    return df.iloc[pick_points(x, df[y_field].to_numpy(), max_points, method)]
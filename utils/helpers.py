@@ -1,124 +1,337 @@
+import glob
+import os
+import numpy as np
 import pandas as pd
 import base64
 import streamlit as st
+from utils.ingest import DISTANCE_CSV_TYPES, MAIN_CSV_TYPES, WEATHER_CSV_TYPES, read_csv_files, scan_csv
+from utils.snapshot import (DATASET_DIR, DISTANCES_SNAPSHOT, WEATHER_SNAPSHOT, aggregate_path, partition_path, read_snapshot,
+                            snapshot_is_fresh, stored_partitions, write_snapshot)
+from utils.calendar_dim import DAY_OF_WEEK_NAMES, MONTH_NAMES, calendar_columns
+from utils.provinces import PROVINCE_TABLE, province_names
+from utils.versioning import versioned
+
+
+# One CSV file per year, each one becomes a partition of the main dataset named after the file
+MAIN_CSV_PREFIX = 'full_dataset_extended_'
+
+# English copy of the same trips, only read for the distance between provinces
+CHAT_CSV_PATTERN = os.path.join(DATASET_DIR, 'dataset_eng_withdist_*.csv')
+
+WEATHER_CSV = os.path.join(DATASET_DIR, 'weather_observation.csv')
+
+# Columns of the main dataset exposed to the chatbot, with their English names (see field_descriptions in chat_helpers)
+CHAT_COLUMNS = {
+    'viajeros': 'travelers',
+    'viajes': 'trips',
+    'provincia_origen': 'origin_province_id',
+    'provincia_origen_name': 'origin_province_name',
+    'provincia_destino': 'destination_province_id',
+    'provincia_destino_name': 'destination_province_name',
+    'day': 'day',
+    'day_of_week': 'day_of_week',
+    'comunidad_origen': 'origin_community',
+    'comunidad_destino': 'destination_community',
+}
+
+# Compact schema of the main dataset: dictionary encoded names and downcast counters
+COMPACT_DTYPES_MAIN = {
+    'row_id': 'int32',
+    'viajeros': 'int32',
+    'viajes': 'int32',
+    'provincia_origen': 'int8',
+    'provincia_origen_name': 'category',
+    'provincia_destino': 'int8',
+    'provincia_destino_name': 'category',
+    'comunidad_origen': 'category',
+    'comunidad_destino': 'category',
+    'trip': 'category',
+    'year': 'int16',
+    'day_number': 'int8',
+}
+
+
+def main_csv_path(name):
+    # CSV file of a partition of the main dataset
+    return os.path.join(DATASET_DIR, f"{name}.csv")
+
+
+def main_partition_names():
+    '''
+    Partitions of the main dataset: one per yearly CSV file, plus the ones only shipped as snapshots.
+    Adding a year is just dropping its CSV file in files/dataset.
+    Returns:
+        names (list): Sorted partition names, e.g. ['full_dataset_extended_2022', ...].
+    '''
+    csv_names = [
+        os.path.basename(path)[:-len('.csv')]
+        for path in glob.glob(os.path.join(DATASET_DIR, f"{MAIN_CSV_PREFIX}*.csv"))
+    ]
+    return sorted(set(csv_names) | set(stored_partitions()))
 
 
-@st.cache_data
-def load_dataset_main():
+def chat_csv_files():
+    return sorted(glob.glob(CHAT_CSV_PATTERN))
+
 
-    # Carga los tres datasets
-    data1 = pd.read_csv('files/dataset/full_dataset_extended_2022.csv')
-    data2 = pd.read_csv('files/dataset/full_dataset_extended_2023.csv')
-    data3 = pd.read_csv('files/dataset/full_dataset_extended_2024.csv')
+def read_dataset_main_csv(paths):
 
-    # Combina los tres datasets en uno solo
-    DATA = pd.concat([data1, data2, data3], ignore_index=True)
+    # Carga los datasets a la vez y los combina en uno solo (tipos explícitos, sin inferencia)
+    DATA = read_csv_files(paths, MAIN_CSV_TYPES)
    
     # Dictionary to map month numbers to month names
-    month_map = {
-        1: 'January', 2: 'February', 3: 'March', 4: 'April', 5: 'May', 6: 'June',
-        7: 'July', 8: 'August', 9: 'September', 10: 'October', 11: 'November', 12: 'December'
-    }
+    month_map = dict(enumerate(MONTH_NAMES, start=1))
 
     # Replace month numbers with month names in the 'month' column
     DATA['month'] = DATA['month'].replace(month_map)
 
-    # Define the correct month order
-    month_order = [
-        'January', 'February', 'March', 'April', 'May', 'June',
-        'July', 'August', 'September', 'October', 'November', 'December'
-    ]
-
-    day_of_week_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-
-    # Convert the 'month' and 'day_of_week' column to a categorical type with the specified order
-    DATA['month'] = pd.Categorical(DATA['month'], categories=month_order, ordered=True)
-    DATA['day_of_week'] = pd.Categorical(DATA['day_of_week'], categories=day_of_week_order, ordered=True)
-
+    # Convert the 'month' and 'day_of_week' column to a categorical type in calendar order
+    DATA['month'] = pd.Categorical(DATA['month'], categories=MONTH_NAMES, ordered=True)
+    DATA['day_of_week'] = pd.Categorical(DATA['day_of_week'], categories=DAY_OF_WEEK_NAMES, ordered=True)
+
+    return compact_dataset_main(DATA)
+
+
+def compact_dataset_main(DATA):
+    '''
+    Cast the main dataset to its compact schema (see COMPACT_DTYPES_MAIN).
+    Parameters:
+        DATA (pd.DataFrame): Main dataset with the default pandas dtypes.
+    Returns:
+        DATA (pd.DataFrame): Same data with categorical names and downcast integer columns.
+    '''
+    dtypes = {column: dtype for column, dtype in COMPACT_DTYPES_MAIN.items() if column in DATA.columns}
+    return DATA.astype(dtypes)
+
+
+def expand_dataset_main(DATA):
+    '''
+    Undo compact_dataset_main, going back to object strings and 64-bit integers.
+    Parameters:
+        DATA (pd.DataFrame): Main dataset with the compact schema.
+    Returns:
+        DATA (pd.DataFrame): Same data with the dtypes pd.read_csv would produce.
+    '''
+    dtypes = {
+        column: object if dtype == 'category' else 'int64'
+        for column, dtype in COMPACT_DTYPES_MAIN.items() if column in DATA.columns
+    }
+    return DATA.astype(dtypes)
+
+
+def memory_report(DATA):
+    '''
+    Compare the memory footprint of the main dataset with and without the compact schema.
+    Parameters:
+        DATA (pd.DataFrame): Main dataset with the compact schema.
+    Returns:
+        report (pd.DataFrame): Bytes per column for both schemas, plus a 'TOTAL' row.
+    '''
+    report = pd.DataFrame({
+        'default_bytes': expand_dataset_main(DATA).memory_usage(index=False, deep=True),
+        'compact_bytes': DATA.memory_usage(index=False, deep=True),
+    })
+    report.loc['TOTAL'] = report.sum()
+    report['ratio'] = (report['default_bytes'] / report['compact_bytes']).round(1)
+    return report
+
+
+def freeze_dataset(DATA):
+    '''
+    Read-only version of a DataFrame, so in-place writes on a shared frame raise an error.
+    Every column is rebuilt on a read-only view of its values, nothing is copied.
+    Parameters:
+        DATA (pd.DataFrame): DataFrame to freeze.
+    Returns:
+        DATA (pd.DataFrame): DataFrame with the same columns and index, backed by read-only arrays.
+    '''
+    columns = {}
+    for column in DATA.columns:
+        values = DATA[column].array
+        if isinstance(values, pd.Categorical):
+            codes = values.codes.view()
+            codes.flags.writeable = False
+            columns[column] = pd.Categorical.from_codes(codes, dtype=values.dtype)
+        else:
+            array = DATA[column].to_numpy().view()
+            array.flags.writeable = False
+            columns[column] = array
+
+    # Built from the column arrays with copy=False, so each column keeps its own read-only block
+    return pd.DataFrame(columns, index=DATA.index, copy=False)
+
+
+def concat_partitions(frames):
+    '''
+    Concatenate partitions of the same table, keeping the categorical columns categorical.
+    Each partition has its own categories, so they are first unified (sorted) before the concat.
+    Parameters:
+        frames (list): DataFrames with the same columns.
+    Returns:
+        df (pd.DataFrame): Rows of every frame, in order.
+    '''
+    dtypes = {}
+    for column in frames[0].columns:
+        dtype = frames[0][column].dtype
+        # Ordered categoricals (months, week days) already share their fixed categories
+        if isinstance(dtype, pd.CategoricalDtype) and not dtype.ordered:
+            categories = sorted(set().union(*(frame[column].cat.categories for frame in frames)))
+            dtypes[column] = pd.CategoricalDtype(categories)
+    return pd.concat([frame.astype(dtypes) for frame in frames], ignore_index=True)
+
+
+def load_main_partition(name, rebuild=False):
+    '''
+    Read one partition of the main dataset from its snapshot, parsing its CSV file only when the
+    snapshot is missing or older than it.
+    Parameters:
+        name (str): Partition name (see main_partition_names).
+        rebuild (bool): Parse the CSV file even if the snapshot is fresh.
+    Returns:
+        DATA (pd.DataFrame): Rows of the partition with the compact schema.
+    '''
+    path = partition_path(name)
+    if not rebuild and snapshot_is_fresh(path, [main_csv_path(name)]):
+        return read_snapshot(path)
+
+    DATA = read_dataset_main_csv([main_csv_path(name)])
+
+    # Refresh the snapshot so the next cold start can skip the CSV file
+    try:
+        write_snapshot(DATA, path)
+    except OSError:
+        pass
     return DATA
 
 
-@st.cache_data
-def load_dataset_weather():
-
-    # Load the data into a DataFrame
-    df = pd.read_csv('files/dataset/weather_observation.csv', sep=';')
-
-    # Drop the 'cod_municipio' column
-    df = df.drop(columns=['cod_municipio'])
-
-    # Convert the 'day' column to a datetime type
-    df['day'] = pd.to_datetime(df['day'])
-
-    # Create new columns for day_of_week, day_number, month, and year
-    df['day_of_week'] = df['day'].dt.day_name()  # Day of the week
-    df['day_number'] = df['day'].dt.day         # Day of the month
-    df['month'] = df['day'].dt.month_name()     # Full month name
-    df['year'] = df['day'].dt.year              # Year
-
+def load_partition_aggregates(name, builders, rebuild=False):
+    '''
+    Read the precomputed aggregates of one partition, building only the ones that are missing or older
+    than the partition. When a new partition is ingested, only its own aggregates have to be computed.
+    Parameters:
+        name (str): Partition name.
+        builders (dict): Aggregate name -> function building it from the rows of a partition.
+        rebuild (bool): Build every aggregate even if it is fresh.
+    Returns:
+        aggregates (dict): Aggregate name -> DataFrame.
+        built (list): Names of the aggregates that had to be built.
+    '''
+    sources = [main_csv_path(name), partition_path(name)]
+    aggregates, built, DATA = {}, [], None
+    for aggregate, build in builders.items():
+        path = aggregate_path(aggregate, name)
+        if not rebuild and snapshot_is_fresh(path, sources):
+            aggregates[aggregate] = read_snapshot(path)
+            continue
+
+        # The partition is read at most once, whatever the number of stale aggregates
+        if DATA is None:
+            DATA = load_main_partition(name)
+        aggregates[aggregate] = build(DATA)
+        built.append(aggregate)
+        try:
+            write_snapshot(aggregates[aggregate], path)
+        except OSError:
+            pass
+    return aggregates, built
+
+
+# cache_resource hands the same frame to every session instead of a copy per call, so it must never be mutated.
+# Every loader is keyed by the dataset version, the previous version is kept while sessions may still use it.
+@st.cache_resource(max_entries=2)
+def load_frozen_dataset_main(version, compact=True):
+
+    # Read the Parquet snapshot of every partition, the CSV files are only parsed for new or changed partitions
+    DATA = concat_partitions([load_main_partition(name) for name in main_partition_names()])
+
+    # The snapshot is stored with the compact schema
+    if not compact:
+        DATA = expand_dataset_main(DATA)
+
+    return freeze_dataset(DATA)
+
+
+@versioned()
+def load_dataset_main(version, compact=True):
+    # A shallow copy of the cached frame: it shares the read-only arrays, but adding or dropping columns
+    # (e.g. DATA['trip_pair'] = ...) only changes the caller's copy
+    return load_frozen_dataset_main(version, compact).copy(deep=False)
+
+
+def read_weather_capitals_csv():
+
+    # Read only the needed columns of the province capitals, the other municipalities are dropped while scanning
+    capital_list = PROVINCE_TABLE['capital'].tolist()
+    df = scan_csv(WEATHER_CSV, WEATHER_CSV_TYPES, filters={'desc_municipio': capital_list}, sep=';')
+
+    # Day of the week, day of the month, month and year, joined from the calendar dimension
+    df = df.join(calendar_columns(df['day'], ['day_of_week', 'day_number', 'month', 'year']))
+
+    # Provinces are identified by their INE code, the name is the one used by the mobility data
+    df['desc_provincia'] = province_names(df['cod_provincia'])
+
+    return df
+
+
+@versioned()
+@st.cache_data(max_entries=2)
+def load_dataset_weather(version):
+
+    # Read the prebuilt extract of the capitals, the CSV file is only scanned when it is missing or stale
+    if snapshot_is_fresh(WEATHER_SNAPSHOT, [WEATHER_CSV]):
+        return read_snapshot(WEATHER_SNAPSHOT)
+
+    df_capitals = read_weather_capitals_csv()
+    try:
+        write_snapshot(df_capitals, WEATHER_SNAPSHOT)
+    except OSError:
+        pass
+    return df_capitals
 
-    province_mapping = {
-        'Rioja, La': 'La Rioja',
-        'Valencia/Valéncia': 'Valencia',
-        'Castellón/Castelló': 'Castellón',
-        'Balears, Illes': 'Islas Baleares',
-        'Araba/Álava': 'Álava',
-        'Coruña, A': 'A Coruña',
-        'Palmas, Las': 'Las Palmas',
-    }
 
-    # Replace province names in 'provincia_destino_name' and 'provincia_origen_name'
-    df['desc_provincia'] = df['desc_provincia'].replace(province_mapping)
-
-
-    # Dictionary of provinces and their capitals
-    province_capitals = {
-        'Alicante': 'Alicante/Alacant', 'Almería': 'Almería', 'Badajoz': 'Badajoz', 'Barcelona': 'Barcelona',
-        'Castellón': 'Castellón de la Plana/Castelló de la Plana', 'Ceuta': 'Ceuta', 'Ciudad Real': 'Ciudad Real',
-        'Cuenca': 'Cuenca', 'Cáceres': 'Cáceres', 'Cádiz': 'Cádiz', 'Córdoba': 'Córdoba',
-        'Girona': 'Girona', 'Granada': 'Granada', 'Guadalajara': 'Guadalajara',
-        'Huelva': 'Huelva', 'Jaén': 'Jaén', 'Lleida': 'Lleida', 'Madrid': 'Madrid',
-        'Murcia': 'Murcia', 'Málaga': 'Málaga', 'Ourense': 'Ourense', 'Las Palmas': 'Palmas de Gran Canaria',
-        'Santa Cruz de Tenerife': 'Santa Cruz de Tenerife', 'Segovia': 'Segovia', 'Sevilla': 'Sevilla', 
-        'Tarragona': 'Tarragona', 'Teruel': 'Teruel', 'Toledo': 'Toledo', 'Valencia': ';València', 
-        'Valladolid': 'Valladolid', 'Zaragoza': 'Zaragoza', 'Albacete': 'Albacete', 
-        'Álava': 'Vitoria-Gasteiz', 'Asturias': 'Oviedo', 'Islas Baleares': 'Palma', 
-        'Bizkaia': 'Bilbao', 'Burgos': 'Burgos', 'Cantabria': 'Santander', 
-        'A Coruña': 'Coruña, A', 'Gipuzkoa': 'Donostia/San Sebastián', 'Huesca': 'Huesca', 
-        'León': 'León', 'Lugo': 'Lugo', 'Navarra': 'Pamplona/Iruña', 'Pontevedra': 'Pontevedra', 
-        'La Rioja': 'Logroño', 'Melilla': 'Melilla', 'Palencia': 'Palencia', 
-        'Salamanca': 'Salamanca', 'Soria': 'Soria', 'Zamora': 'Zamora', 'Ávila': 'Ávila'
-    }
+def read_distances_csv():
+    '''
+    Read the distance between every pair of provinces from the English CSV files.
+    Returns:
+        distances (pd.DataFrame): One row per (origin_province_id, destination_province_id) pair with its 'distance' in km.
+    '''
+    distances = read_csv_files(chat_csv_files(), DISTANCE_CSV_TYPES)
+    return distances.drop_duplicates(['origin_province_id', 'destination_province_id'], ignore_index=True)
 
-    # Get the list of all capitals
-    capital_list = list(province_capitals.values())
 
-    # Filter the dataframe to keep only rows with capitals
-    df_capitals = df[df['desc_municipio'].isin(capital_list)]
+def load_distances():
+    # Same snapshot logic as the main dataset, the table is tiny once reduced to one row per pair
+    if snapshot_is_fresh(DISTANCES_SNAPSHOT, chat_csv_files()):
+        return read_snapshot(DISTANCES_SNAPSHOT)
 
-    # Reset the index for cleanliness
-    df_capitals.reset_index(drop=True, inplace=True)
-    return df_capitals
+    distances = read_distances_csv()
+    try:
+        write_snapshot(distances, DISTANCES_SNAPSHOT)
+    except OSError:
+        pass
+    return distances
 
 
-@st.cache_data
-def load_dataset_chat():
+# The chat dataset is a renamed view on the main dataset, so both pages share the same arrays
+@versioned()
+@st.cache_resource(max_entries=2)
+def load_dataset_chat(version):
+    DATA = load_dataset_main.for_version(version)
+    distances = load_distances()
 
-    data1_chat = pd.read_csv('files/dataset/dataset_eng_withdist_2022.csv')
-    data2_chat = pd.read_csv('files/dataset/dataset_eng_withdist_2023.csv')
-    data3_chat = pd.read_csv('files/dataset/dataset_eng_withdist_2024.csv')
+    # Province ids are small integers, so the distance of every row is a lookup in a dense pair matrix
+    size = int(max(DATA['provincia_origen'].max(), DATA['provincia_destino'].max(),
+               distances['origin_province_id'].max(), distances['destination_province_id'].max())) + 1
+    pair_distance = np.full((size, size), np.nan, dtype=np.float32)
+    pair_distance[distances['origin_province_id'], distances['destination_province_id']] = distances['distance']
 
-    DATA_simple_chat = pd.concat([data1_chat, data2_chat, data3_chat], ignore_index=True)
+    # copy=False keeps the columns of the main dataset instead of duplicating them
+    DATA_simple_chat = pd.DataFrame({english: DATA[spanish] for spanish, english in CHAT_COLUMNS.items()}, copy=False)
+    DATA_simple_chat['distance'] = pair_distance[DATA['provincia_origen'].to_numpy(), DATA['provincia_destino'].to_numpy()]
 
     return DATA_simple_chat
 
 
-@st.cache_data
-def filter_data_by_province(data, province_keys):
-    return data[data['provincia_destino_name'].isin(province_keys)].copy()
-
-
-
 # Configuración inicial
 @st.cache_data
 def setup_headers():
@@ -0,0 +1,192 @@
+import pandas as pd
+import streamlit as st
+from utils.calendar_dim import day_key, load_calendar
+from utils.provinces import COMMUNITIES
+from utils.query import TABLE_NAME, query
+from utils.versioning import versioned
+
+# Holidays of a single autonomous community, on the same date every year: community -> [(month, day, name)]
+REGIONAL_HOLIDAYS = {
+    'Andalucía': [(2, 28, 'Day of Andalucía')],
+    'Aragón': [(4, 23, 'Day of Aragón')],
+    'Asturias': [(9, 8, 'Day of Asturias')],
+    'Islas Baleares': [(3, 1, 'Day of the Balearic Islands')],
+    'Canarias': [(5, 30, 'Day of the Canary Islands')],
+    'Cantabria': [(7, 28, 'Day of the Cantabrian Institutions')],
+    'Castilla y León': [(4, 23, 'Day of Castilla y León')],
+    'Castilla-La Mancha': [(5, 31, 'Day of Castilla-La Mancha')],
+    'Cataluña': [(6, 24, "Saint John's Day"), (9, 11, 'National Day of Catalonia'), (12, 26, "Saint Stephen's Day")],
+    'Comunidad Valenciana': [(3, 19, "Saint Joseph's Day"), (6, 24, "Saint John's Day"), (10, 9, 'Day of the Valencian Community')],
+    'Extremadura': [(9, 8, 'Day of Extremadura')],
+    'Galicia': [(5, 17, 'Galician Literature Day'), (7, 25, 'National Day of Galicia')],
+    'Madrid': [(5, 2, 'Day of the Community of Madrid')],
+    'Murcia': [(6, 9, 'Day of the Region of Murcia')],
+    'Navarra': [(12, 3, 'Day of Navarra')],
+    'País Vasco': [(7, 25, "Saint James' Day")],
+    'La Rioja': [(6, 9, 'Day of La Rioja')],
+    'Ceuta': [(9, 2, 'Day of Ceuta')],
+    'Melilla': [(9, 17, 'Day of Melilla')],
+}
+
+# Regional holidays relative to Easter Sunday: (days from Easter Sunday, name, communities). Good Friday is
+# a national holiday, it comes with the calendar
+EASTER_HOLIDAYS = [
+    (-3, 'Holy Thursday', [name for name in COMMUNITIES.values() if name not in ('Cataluña', 'Comunidad Valenciana')]),
+    (1, 'Easter Monday', ['Cataluña', 'Comunidad Valenciana', 'Navarra', 'País Vasco', 'Islas Baleares', 'La Rioja']),
+]
+
+# Holiday periods analysed by the engine: kind -> (predicate selecting the days of the periods in the calendar,
+# label of the period of each day). The days sharing a label form one period, so a new kind of period
+# only needs an entry here (and a section in pages/holidays.py to show it).
+HOLIDAY_PERIODS = {
+    'Christmas': (lambda calendar: calendar['is_christmas'], lambda calendar: calendar['christmas_season']),
+    'Easter': (lambda calendar: calendar['is_holy_week'], lambda calendar: calendar['year'].astype(str)),
+}
+
+
+def period_labels(calendar):
+    '''
+    Label of the holiday period of every day of the calendar, for every kind of HOLIDAY_PERIODS.
+    Parameters:
+        calendar (pd.DataFrame): Calendar dimension (see utils.calendar_dim.build_calendar).
+    Returns:
+        labels (dict): Kind of period -> pd.Series of labels aligned with the calendar, e.g. '2022-2023' for
+        Christmas or '2023' for Easter, NaN outside the periods.
+    '''
+    return {kind: label(calendar).where(predicate(calendar)) for kind, (predicate, label) in HOLIDAY_PERIODS.items()}
+
+
+def holiday_periods(calendar):
+    '''
+    Every holiday period lying inside the calendar, the ones cut by its first or last day are left out.
+    Parameters:
+        calendar (pd.DataFrame): Calendar dimension, one row per day in order.
+    Returns:
+        periods (pd.DataFrame): 'kind', 'period' (label), 'start' and 'end', sorted by start.
+    '''
+    spans = []
+    for kind, labels in period_labels(calendar).items():
+        span = calendar['day'].groupby(labels).agg(['min', 'max'])
+        spans.append(pd.DataFrame({'kind': kind, 'period': span.index, 'start': span['min'].to_numpy(), 'end': span['max'].to_numpy()}))
+    periods = pd.concat(spans, ignore_index=True)
+    inside = (periods['start'] > calendar['day'].iloc[0]) & (periods['end'] < calendar['day'].iloc[-1])
+    return periods[inside].sort_values('start', ignore_index=True)
+
+
+def period_days(calendar, periods):
+    # One row per day of every period: 'kind', 'period', 'day_key' and 'day'
+    days = pd.concat([
+        pd.DataFrame({'kind': kind, 'period': labels, 'day_key': calendar.index, 'day': calendar['day']}).dropna(subset=['period'])
+        for kind, labels in period_labels(calendar).items()
+    ], ignore_index=True)
+    return days.merge(periods[['kind', 'period']], on=['kind', 'period'])
+
+
+def regional_holidays(calendar):
+    '''
+    Holidays of a single autonomous community falling inside the calendar.
+    Parameters:
+        calendar (pd.DataFrame): Calendar dimension.
+    Returns:
+        holidays (pd.DataFrame): 'day_key', 'community' and 'holiday' name, one row per community and day.
+    '''
+    month_days = calendar['month_number'].astype(int) * 100 + calendar['day_number']
+    rows = [
+        (key, community, name)
+        for community, holidays in REGIONAL_HOLIDAYS.items()
+        for month, day, name in holidays
+        for key in calendar.index[month_days.to_numpy() == month * 100 + day]
+    ]
+
+    # Easter Sunday is the last day of every Holy Week of the calendar (Palm Sunday is followed by Holy Monday)
+    holy_week = calendar['is_holy_week']
+    easters = calendar.loc[holy_week & ~holy_week.shift(-1, fill_value=True), 'day']
+    for offset, name, communities in EASTER_HOLIDAYS:
+        keys = calendar.index.intersection(day_key(easters + pd.Timedelta(days=offset)))
+        rows += [(key, community, name) for key in keys for community in communities]
+
+    holidays = pd.DataFrame(rows, columns=['day_key', 'community', 'holiday'])
+    return holidays.drop_duplicates(['community', 'day_key'])
+
+
+def community_holidays(breakdown, community_column, calendar, regional):
+    # Name of the holiday of each community on each day (its own or a national one), empty on working days
+    regional = regional.rename(columns={'community': community_column})
+    holiday = breakdown[[community_column, 'day_key']].astype({community_column: str}).merge(
+        regional, on=[community_column, 'day_key'], how='left')['holiday']
+    return holiday.fillna(breakdown['day_key'].map(calendar['national_holiday'])).fillna('').to_numpy()
+
+
+def build_holiday_analytics(daily_communities, periods, calendar):
+    '''
+    Daily travelers and community breakdowns of every holiday period, in one pass over the daily totals.
+    Parameters:
+        daily_communities (pd.DataFrame): Travelers per day ('day_key' and 'day') and origin community
+        ('comunidad_origen' set) or destination community ('comunidad_destino' set).
+        periods (pd.DataFrame): Holiday periods (see holiday_periods).
+        calendar (pd.DataFrame): Calendar dimension the periods and holidays are read from.
+    Returns:
+        analytics (dict): (kind, period) -> dict with 'daily' ('day', 'viajeros'), 'origin' and
+        'destination' ('comunidad_origen'/'comunidad_destino', 'day', 'viajeros', 'holiday').
+    '''
+    days = period_days(calendar, periods)
+    regional = regional_holidays(calendar)
+    breakdowns = {}
+    for side, community_column in [('origin', 'comunidad_origen'), ('destination', 'comunidad_destino')]:
+        side_totals = daily_communities.dropna(subset=[community_column])[[community_column, 'day_key', 'viajeros']]
+        breakdown = days.merge(side_totals, on='day_key').sort_values(['kind', 'period', community_column, 'day'], ignore_index=True)
+        breakdown['holiday'] = community_holidays(breakdown, community_column, calendar, regional)
+        breakdowns[side] = breakdown.drop(columns='day_key')
+
+    # Both sides count every traveler once, the daily totals come from the origins
+    daily = breakdowns['origin'].groupby(['kind', 'period', 'day'], sort=True)['viajeros'].sum().reset_index()
+
+    analytics = {key: {} for key in periods[['kind', 'period']].itertuples(index=False, name=None)}
+    for name, frame in [('daily', daily), *breakdowns.items()]:
+        for key, period_frame in frame.groupby(['kind', 'period'], sort=False):
+            analytics[key][name] = period_frame.drop(columns=['kind', 'period']).reset_index(drop=True)
+    return analytics
+
+
+@versioned()
+@st.cache_resource(max_entries=2)
+def load_holiday_analytics(version):
+    '''
+    Holiday periods covered by the main dataset and their precomputed breakdowns, once per dataset version.
+    Returns:
+        periods (pd.DataFrame): Holiday periods (see holiday_periods).
+        analytics (dict): Breakdowns of every period (see build_holiday_analytics).
+    '''
+    # Travelers per day and community of each side, both grouping sets in a single scan
+    daily_communities = query(
+        f'SELECT "day", "comunidad_origen", "comunidad_destino", SUM("viajeros")::BIGINT AS viajeros FROM {TABLE_NAME} '
+        f'GROUP BY GROUPING SETS (("day", "comunidad_origen"), ("day", "comunidad_destino"))',
+        version=version,
+    )
+    if daily_communities.empty:
+        return pd.DataFrame(columns=['kind', 'period', 'start', 'end']), {}
+
+    # Periods and holidays come from the calendar dimension, joined to the daily totals by day key
+    calendar = load_calendar.for_version(version)
+    daily_communities['day_key'] = day_key(daily_communities['day'])
+    periods = holiday_periods(calendar)
+    return periods, build_holiday_analytics(daily_communities, periods, calendar)
+
+
+def holiday_period_labels(kind):
+    # Labels of the periods of a kind covered by the data, in chronological order
+    periods, _ = load_holiday_analytics()
+    return periods.loc[periods['kind'] == kind, 'period'].tolist()
+
+
+def holiday_period(kind, period):
+    '''
+    Precomputed data of a holiday period.
+    Parameters:
+        kind (str): Kind of period, a key of HOLIDAY_PERIODS.
+        period (str): Label of the period, e.g. '2022-2023' for Christmas or '2023' for Easter.
+    Returns:
+        data (dict): 'daily', 'origin' and 'destination' frames (see build_holiday_analytics), empty when unknown.
+    '''
+    _, analytics = load_holiday_analytics()
+    return analytics.get((kind, period), {})
@@ -0,0 +1,118 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
+
+# Names stored as dictionaries, they reach pandas as categoricals without building Python strings first
+NAME = pa.dictionary(pa.int32(), pa.string())
+
+# Explicit Arrow types of the CSV files, so the parser never has to infer them
+MAIN_CSV_TYPES = {
+    'row_id': pa.int32(),
+    'viajeros': pa.int32(),
+    'viajes': pa.int32(),
+    'provincia_origen': pa.int8(),
+    'provincia_origen_name': NAME,
+    'provincia_destino': pa.int8(),
+    'provincia_destino_name': NAME,
+    'day': pa.timestamp('s'),
+    'day_of_week': NAME,
+    'comunidad_origen': NAME,
+    'comunidad_destino': NAME,
+    'year': pa.int16(),
+    'month': pa.int8(),
+    'day_number': pa.int8(),
+    'trip': NAME,
+}
+
+DISTANCE_CSV_TYPES = {
+    'origin_province_id': pa.int8(),
+    'destination_province_id': pa.int8(),
+    'distance': pa.float32(),
+}
+
+# Only the weather columns shown by the weather page
+WEATHER_CSV_TYPES = {
+    'desc_municipio': pa.string(),
+    'cod_provincia': pa.int8(),
+    'desc_provincia': pa.string(),
+    'day': pa.timestamp('s'),
+    'tempmax': pa.float64(),
+    'tempmin': pa.float64(),
+    'temp': pa.float64(),
+    'preciptype': pa.string(),
+}
+
+
+def read_csv_table(path, column_types, sep=','):
+    '''
+    Parse one CSV file into an Arrow table with the multi-threaded pyarrow reader.
+    Parameters:
+        path (str): CSV file.
+        column_types (dict): Column -> Arrow type. Only these columns are read.
+        sep (str): Field delimiter.
+    Returns:
+        table (pa.Table): Typed table with the columns of `column_types`.
+    '''
+    return pv.read_csv(
+        path,
+        read_options=pv.ReadOptions(use_threads=True),
+        parse_options=pv.ParseOptions(delimiter=sep),
+        convert_options=pv.ConvertOptions(
+            column_types=column_types,
+            include_columns=list(column_types),
+            strings_can_be_null=True,
+        ),
+    )
+
+
+def read_csv_files(paths, column_types, sep=','):
+    '''
+    Read several CSV files with the same layout concurrently and return them as a single DataFrame.
+    Each file is parsed by its own thread (pyarrow releases the GIL) and also splits its blocks across
+    cores. The tables are concatenated as Arrow chunks, so the only copy is the final conversion to pandas.
+    Parameters:
+        paths (list): CSV files, e.g. one per year.
+        column_types (dict): Column -> Arrow type. Only these columns are read.
+        sep (str): Field delimiter.
+    Returns:
+        df (pd.DataFrame): Rows of every file, in the order of `paths`. Dictionary columns become
+        categoricals with sorted categories, like DataFrame.astype('category') would produce.
+    '''
+    workers = min(len(paths), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        tables = list(executor.map(lambda path: read_csv_table(path, column_types, sep), paths))
+
+    df = pa.concat_tables(tables).to_pandas(split_blocks=True)
+
+    # Arrow keeps the categories in order of appearance, sort them so groupby and the rollups order as before
+    for column, arrow_type in column_types.items():
+        if pa.types.is_dictionary(arrow_type):
+            df[column] = df[column].cat.reorder_categories(sorted(df[column].cat.categories))
+    return df
+
+
+def scan_csv(path, column_types, filters=None, sep=','):
+    '''
+    Read the rows of a CSV file matching some filters, applied batch by batch while scanning,
+    so the rows that are filtered out are never held in memory or converted to pandas.
+    Parameters:
+        path (str): CSV file.
+        column_types (dict): Column -> Arrow type. Only these columns are read.
+        filters (dict): Column -> list of accepted values.
+        sep (str): Field delimiter.
+    Returns:
+        df (pd.DataFrame): Matching rows with the columns of `column_types`.
+    '''
+    csv_format = ds.CsvFileFormat(
+        parse_options=pv.ParseOptions(delimiter=sep),
+        convert_options=pv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+    )
+    expression = None
+    for column, values in (filters or {}).items():
+        condition = ds.field(column).isin(values)
+        expression = condition if expression is None else expression & condition
+
+    table = ds.dataset(path, format=csv_format).to_table(columns=list(column_types), filter=expression)
+    return table.to_pandas(split_blocks=True)
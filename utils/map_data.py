@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.calendar_dim import DAY_OF_WEEK_NAMES, MONTH_NAMES
+from utils.cube import CALENDAR_COLUMNS, load_cube
+from utils.provinces import PROVINCE_TABLE
+from utils.versioning import versioned
+
+
+class DestinationMaps:
+    '''
+    Travelers arriving to every province, stored as dense arrays of sums and row counts per
+    (province, year, month, day of the week) and per (day, province), with the name and coordinates of each
+    province joined from the province table by INE code. Every map of the Maps page is a reduction of these arrays.
+    '''
+    def __init__(self, provinces, years, totals, rows, days, day_totals, day_rows):
+        # INE codes of the destination provinces
+        self.provinces = pd.Index(provinces)
+        self.years = pd.Index(years)
+        self.totals = totals
+        self.rows = rows
+        self.days = pd.DatetimeIndex(days)
+        self.day_totals = day_totals
+        self.day_rows = day_rows
+        provinces = PROVINCE_TABLE.reindex(self.provinces)
+        self.names = provinces['name'].to_numpy()
+        # (provinces, 2) array of latitude and longitude, NaN for the codes missing from the province table
+        self.coordinates = provinces[['latitude', 'longitude']].to_numpy(dtype=float)
+
+    @classmethod
+    def from_cube(cls, cube):
+        '''
+        Build the arrays from the cuboids by destination province, in one grouped pass over each.
+        Parameters:
+            cube (list): (columns, DataFrame) pairs (see load_cube).
+        Returns:
+            maps (DestinationMaps): Arrays for every destination province.
+        '''
+        cuboids = {tuple(columns): cuboid for columns, cuboid in cube}
+        calendar = cuboids[('provincia_destino', 'provincia_destino_name', *CALENDAR_COLUMNS)]
+        daily = cuboids[('provincia_destino', 'day')]
+
+        provinces = pd.Index(np.union1d(calendar['provincia_destino'], daily['provincia_destino']).astype(np.int64))
+        years = pd.Index(sorted(calendar['year'].unique()))
+
+        # Sums and counts per (province, year, month, day of the week), missing cells are 0
+        shape = (len(provinces), len(years), len(MONTH_NAMES), len(DAY_OF_WEEK_NAMES))
+        cells = np.ravel_multi_index((
+            provinces.get_indexer(calendar['provincia_destino']),
+            years.get_indexer(calendar['year']),
+            pd.Categorical(calendar['month'].astype(str), categories=MONTH_NAMES).codes,
+            pd.Categorical(calendar['day_of_week'].astype(str), categories=DAY_OF_WEEK_NAMES).codes,
+        ), shape)
+        totals = np.bincount(cells, weights=calendar['viajeros'].to_numpy(), minlength=np.prod(shape)).reshape(shape)
+        rows = np.bincount(cells, weights=calendar['n_rows'].to_numpy(), minlength=np.prod(shape)).reshape(shape)
+
+        # Sums and counts per (day, province) over the dense daily axis
+        days = pd.date_range(daily['day'].min(), daily['day'].max(), freq='D')
+        day_shape = (len(days), len(provinces))
+        day_cells = np.ravel_multi_index((
+            ((daily['day'] - days[0]) // pd.Timedelta(days=1)).to_numpy(),
+            provinces.get_indexer(daily['provincia_destino']),
+        ), day_shape)
+        day_totals = np.bincount(day_cells, weights=daily['viajeros'].to_numpy(), minlength=np.prod(day_shape)).reshape(day_shape)
+        day_rows = np.bincount(day_cells, weights=daily['n_rows'].to_numpy(), minlength=np.prod(day_shape)).reshape(day_shape)
+
+        return cls(provinces, years, totals.astype(np.int64), rows.astype(np.int64),
+                   days, day_totals.astype(np.int64), day_rows.astype(np.int64))
+
+    def _frame(self, travelers, rows):
+        # Provinces with rows and coordinates, in the layout expected by plot_map
+        frame = pd.DataFrame({
+            'provincia_destino': self.provinces,
+            'provincia_destino_name': self.names,
+            'viajeros': travelers,
+            'latitude': self.coordinates[:, 0],
+            'longitude': self.coordinates[:, 1],
+        })
+        return frame[(rows > 0) & ~np.isnan(self.coordinates[:, 0])].reset_index(drop=True)
+
+    def _calendar_slice(self, year=None, month=None, day_of_week=None):
+        # Sums and counts per province over the calendar cells selected (all of an axis when not given)
+        positions = [
+            None if year is None else [self.years.get_loc(year)] if year in self.years else [],
+            None if month is None else [MONTH_NAMES.index(month)],
+            None if day_of_week is None else [DAY_OF_WEEK_NAMES.index(day_of_week)],
+        ]
+        totals, rows = self.totals, self.rows
+        for axis, position in enumerate(positions, start=1):
+            if position is not None:
+                totals, rows = totals.take(position, axis=axis), rows.take(position, axis=axis)
+        return totals.sum(axis=(1, 2, 3)), rows.sum(axis=(1, 2, 3))
+
+    def destination_totals(self, year=None, month=None):
+        '''
+        Total travelers arriving to each province, for a year and/or month (all of them when not given).
+        Returns:
+            frame (pd.DataFrame): 'provincia_destino', 'provincia_destino_name', 'viajeros', 'latitude' and 'longitude'.
+        '''
+        totals, rows = self._calendar_slice(year, month)
+        return self._frame(totals, rows)
+
+    def destination_means(self, month, day_of_week):
+        '''
+        Average travelers per row of the main dataset arriving to each province, on a day of the week of a month.
+        Returns:
+            frame (pd.DataFrame): 'provincia_destino', 'provincia_destino_name', 'viajeros', 'latitude' and 'longitude'.
+        '''
+        totals, rows = self._calendar_slice(month=month, day_of_week=day_of_week)
+        return self._frame(totals / np.maximum(rows, 1), rows)
+
+    def day_means(self, day):
+        '''
+        Average travelers per row of the main dataset arriving to each province on a date.
+        Returns:
+            frame (pd.DataFrame): 'provincia_destino', 'provincia_destino_name', 'viajeros', 'latitude' and 'longitude'.
+        '''
+        position = (pd.Timestamp(day) - self.days[0]).days if len(self.days) else -1
+        if not 0 <= position < len(self.days):
+            return self._frame(np.zeros(len(self.provinces)), np.zeros(len(self.provinces)))
+        totals, rows = self.day_totals[position], self.day_rows[position]
+        return self._frame(totals / np.maximum(rows, 1), rows)
+
+
+@versioned()
+@st.cache_resource(max_entries=2)
+def load_destination_maps(version):
+    # Arrays behind every map of the Maps page, built once per dataset version from the cube
+    return DestinationMaps.from_cube(load_cube.for_version(version))
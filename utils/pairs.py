@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.helpers import load_partition_aggregates, main_partition_names
+from utils.versioning import versioned
+
+
+def build_pair_totals(DATA, measure='viajeros'):
+    '''
+    Total travelers per undirected pair of provinces (A to B and B to A count together).
+    Parameters:
+        DATA (pd.DataFrame): Main dataset.
+        measure (str): Column to sum.
+    Returns:
+        pair_totals (pd.DataFrame): 'origin', 'destination' (INE codes, the smallest first) and the measure, largest first.
+    '''
+    origin = DATA['provincia_origen'].to_numpy(dtype=np.int64)
+    destination = DATA['provincia_destino'].to_numpy(dtype=np.int64)
+
+    # INE codes are small integers, so every pair is a cell of a dense (code, code) grid
+    size = int(max(origin.max(initial=0), destination.max(initial=0))) + 1
+    pairs = np.minimum(origin, destination) * size + np.maximum(origin, destination)
+    totals = np.bincount(pairs, weights=DATA[measure].to_numpy(), minlength=size * size)
+
+    observed = np.flatnonzero(totals)
+    first, second = np.divmod(observed, size)
+    pair_totals = pd.DataFrame({
+        'origin': first,
+        'destination': second,
+        measure: totals[observed].astype(np.int64),
+    })
+    return pair_totals.sort_values(measure, ascending=False, ignore_index=True)
+
+
+# Aggregate name -> builder, used to store the pair totals of every partition
+PAIR_BUILDERS = {'pairs': build_pair_totals}
+
+
+@versioned()
+@st.cache_resource(max_entries=2)
+def load_pair_totals(version):
+    # Undirected pair totals of the main dataset, merged from the totals stored for every partition
+    partitions = [load_partition_aggregates(name, PAIR_BUILDERS)[0]['pairs'] for name in main_partition_names()]
+    pair_totals = pd.concat(partitions, ignore_index=True).groupby(['origin', 'destination'], as_index=False)['viajeros'].sum()
+    return pair_totals.sort_values('viajeros', ascending=False, ignore_index=True)
+
+
+def top_pairs(k, pair_totals=None):
+    '''
+    The k undirected pairs of provinces with the most travelers.
+    Parameters:
+        k (int): Number of pairs.
+        pair_totals (pd.DataFrame): Table from build_pair_totals, defaults to the cached one.
+    Returns:
+        top (pd.DataFrame): First k rows of the pair table.
+    '''
+    if pair_totals is None:
+        pair_totals = load_pair_totals()
+    return pair_totals.head(k)
@@ -0,0 +1,122 @@
+import pandas as pd
+
+# Autonomous communities: INE code -> name used by the mobility data
+COMMUNITIES = {
+    1: 'Andalucía',
+    2: 'Aragón',
+    3: 'Asturias',
+    4: 'Islas Baleares',
+    5: 'Canarias',
+    6: 'Cantabria',
+    7: 'Castilla y León',
+    8: 'Castilla-La Mancha',
+    9: 'Cataluña',
+    10: 'Comunidad Valenciana',
+    11: 'Extremadura',
+    12: 'Galicia',
+    13: 'Madrid',
+    14: 'Murcia',
+    15: 'Navarra',
+    16: 'País Vasco',
+    17: 'La Rioja',
+    18: 'Ceuta',
+    19: 'Melilla',
+}
+
+# Provinces: (INE code, name used by the mobility data, community code, capital as named in the weather
+# observations, latitude, longitude, other spellings found in the datasets)
+PROVINCES = [
+    (1, 'Álava', 16, 'Vitoria-Gasteiz', 42.8467, -2.6738, ('Araba/Álava', 'Araba', 'Alava')),
+    (2, 'Albacete', 8, 'Albacete', 38.9943, -1.8564, ()),
+    (3, 'Alicante', 10, 'Alicante/Alacant', 38.3452, -0.4810, ('Alicante/Alacant', 'Alacant')),
+    (4, 'Almería', 1, 'Almería', 36.8340, -2.4637, ()),
+    (5, 'Ávila', 7, 'Ávila', 40.6564, -4.6814, ()),
+    (6, 'Badajoz', 11, 'Badajoz', 38.8794, -6.9706, ()),
+    (7, 'Islas Baleares', 4, 'Palma', 39.6953, 3.0176, ('Balears, Illes', 'Illes Balears', 'Baleares')),
+    (8, 'Barcelona', 9, 'Barcelona', 41.3851, 2.1734, ()),
+    (9, 'Burgos', 7, 'Burgos', 42.3439, -3.6969, ()),
+    (10, 'Cáceres', 11, 'Cáceres', 39.4755, -6.3723, ()),
+    (11, 'Cádiz', 1, 'Cádiz', 36.5164, -6.2994, ()),
+    (12, 'Castellón', 10, 'Castellón de la Plana/Castelló de la Plana', 39.9864, -0.0513, ('Castellón/Castelló', 'Castelló')),
+    (13, 'Ciudad Real', 8, 'Ciudad Real', 38.9848, -3.9272, ()),
+    (14, 'Córdoba', 1, 'Córdoba', 37.8882, -4.7794, ()),
+    (15, 'A Coruña', 12, 'Coruña, A', 43.3623, -8.4115, ('Coruña, A', 'La Coruña')),
+    (16, 'Cuenca', 8, 'Cuenca', 40.0704, -2.1374, ()),
+    (17, 'Girona', 9, 'Girona', 41.9794, 2.8214, ('Gerona',)),
+    (18, 'Granada', 1, 'Granada', 37.1773, -3.5986, ()),
+    (19, 'Guadalajara', 8, 'Guadalajara', 40.6293, -3.1628, ()),
+    (20, 'Gipuzkoa', 16, 'Donostia/San Sebastián', 43.3128, -1.9750, ('Guipúzcoa',)),
+    (21, 'Huelva', 1, 'Huelva', 37.2614, -6.9447, ()),
+    (22, 'Huesca', 2, 'Huesca', 42.1401, -0.4089, ()),
+    (23, 'Jaén', 1, 'Jaén', 37.7796, -3.7849, ()),
+    (24, 'León', 7, 'León', 42.5987, -5.5671, ()),
+    (25, 'Lleida', 9, 'Lleida', 41.6176, 0.6200, ('Lérida',)),
+    (26, 'La Rioja', 17, 'Logroño', 42.2871, -2.5396, ('Rioja, La',)),
+    (27, 'Lugo', 12, 'Lugo', 43.0099, -7.5560, ()),
+    (28, 'Madrid', 13, 'Madrid', 40.4168, -3.7038, ()),
+    (29, 'Málaga', 1, 'Málaga', 36.7213, -4.4214, ()),
+    (30, 'Murcia', 14, 'Murcia', 37.9922, -1.1307, ()),
+    (31, 'Navarra', 15, 'Pamplona/Iruña', 42.6954, -1.6761, ('Navarra/Nafarroa',)),
+    (32, 'Ourense', 12, 'Ourense', 42.3359, -7.8639, ('Orense',)),
+    (33, 'Asturias', 3, 'Oviedo', 43.3619, -5.8494, ()),
+    (34, 'Palencia', 7, 'Palencia', 42.0095, -4.5284, ()),
+    (35, 'Las Palmas', 5, 'Palmas de Gran Canaria', 28.1235, -15.4363, ('Palmas, Las',)),
+    (36, 'Pontevedra', 12, 'Pontevedra', 42.4300, -8.6444, ()),
+    (37, 'Salamanca', 7, 'Salamanca', 40.9701, -5.6635, ()),
+    (38, 'Santa Cruz de Tenerife', 5, 'Santa Cruz de Tenerife', 28.4636, -16.2518, ()),
+    (39, 'Cantabria', 6, 'Santander', 43.1828, -3.9878, ()),
+    (40, 'Segovia', 7, 'Segovia', 40.9429, -4.1088, ()),
+    (41, 'Sevilla', 1, 'Sevilla', 37.3886, -5.9823, ()),
+    (42, 'Soria', 7, 'Soria', 41.7640, -2.4688, ()),
+    (43, 'Tarragona', 9, 'Tarragona', 41.1189, 1.2445, ()),
+    (44, 'Teruel', 2, 'Teruel', 40.3440, -1.1069, ()),
+    (45, 'Toledo', 8, 'Toledo', 39.8628, -4.0273, ()),
+    (46, 'Valencia', 10, 'València', 39.4699, -0.3763, ('Valencia/Valéncia', 'Valencia/València', 'València')),
+    (47, 'Valladolid', 7, 'Valladolid', 41.6523, -4.7245, ()),
+    (48, 'Bizkaia', 16, 'Bilbao', 43.2630, -2.9350, ('Vizcaya',)),
+    (49, 'Zamora', 7, 'Zamora', 41.5033, -5.7445, ()),
+    (50, 'Zaragoza', 2, 'Zaragoza', 41.6488, -0.8891, ()),
+    (51, 'Ceuta', 18, 'Ceuta', 35.8894, -5.3198, ()),
+    (52, 'Melilla', 19, 'Melilla', 35.2923, -2.9381, ()),
+]
+
+# Dimension table of the provinces, indexed by their INE code
+PROVINCE_TABLE = pd.DataFrame(
+    PROVINCES,
+    columns=['province_id', 'name', 'community_id', 'capital', 'latitude', 'longitude', 'aliases'],
+).set_index('province_id')
+PROVINCE_TABLE.insert(2, 'community', PROVINCE_TABLE['community_id'].map(COMMUNITIES))
+
+# Every spelling of a province (canonical names included) -> INE code
+PROVINCE_IDS = {
+    spelling: province_id
+    for province_id, name, _, _, _, _, aliases in PROVINCES
+    for spelling in (name, *aliases)
+}
+
+
+def province_id(name):
+    '''
+    INE code of a province from any of its spellings.
+    Parameters:
+        name (str): Province name, e.g. 'Rioja, La' or 'La Rioja'.
+    Returns:
+        province_id (int): INE code, None for an unknown name.
+    '''
+    return PROVINCE_IDS.get(name)
+
+
+def province_names(province_ids):
+    '''
+    Canonical names of some provinces, as used by the mobility data.
+    Parameters:
+        province_ids (pd.Series): INE codes.
+    Returns:
+        names (pd.Series): Province names, NaN for unknown codes.
+    '''
+    return province_ids.map(PROVINCE_TABLE['name'])
+
+
+def province_coordinates():
+    # Latitude and longitude of every province, indexed by INE code
+    return PROVINCE_TABLE[['latitude', 'longitude']]
@@ -0,0 +1,46 @@
+import duckdb
+import pyarrow as pa
+import streamlit as st
+from utils.helpers import load_dataset_main
+from utils.versioning import versioned
+
+# Name of the main dataset inside DuckDB
+TABLE_NAME = 'mobility'
+
+
+@versioned()
+@st.cache_resource(max_entries=2)
+def get_duckdb(version):
+    '''
+    Create the DuckDB connection and the Arrow table it queries, once per dataset version.
+    Parameters:
+        version (str): Dataset version (see utils.versioning), filled in for callers.
+    Returns:
+        connection (duckdb.DuckDBPyConnection): In-memory DuckDB database.
+        table (pa.Table): Main dataset as an Arrow table (no copy of the numeric columns).
+    '''
+    DATA = load_dataset_main.for_version(version)
+    table = pa.Table.from_pandas(DATA, preserve_index=False)
+    return duckdb.connect(), table
+
+
+def query(sql, params=None, version=None):
+    '''
+    Run a SQL query against the main dataset, available as the 'mobility' table.
+    Parameters:
+        sql (str): SQL query, use '?' placeholders for the values.
+        params (list): Values for the placeholders.
+        version (str): Dataset version to query, defaults to the one of the session.
+    Returns:
+        result (pd.DataFrame): Result of the query.
+    '''
+    connection, table = get_duckdb() if version is None else get_duckdb.for_version(version)
+
+    # Every query gets its own cursor so concurrent sessions do not share connection state
+    cursor = connection.cursor()
+    try:
+        cursor.register(TABLE_NAME, table)
+        return cursor.execute(sql, params or []).df()
+    finally:
+        cursor.close()
+
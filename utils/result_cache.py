@@ -0,0 +1,104 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from utils.versioning import current_version
+
+
+def make_key(value):
+    '''
+    Hashable key for the parameters of a query. Lists and tuples keep their type in the key, since
+    they mean different filters (IN vs BETWEEN).
+    '''
+    if isinstance(value, dict):
+        return ('dict', tuple(sorted((key, make_key(item)) for key, item in value.items())))
+    if isinstance(value, (list, tuple, set)):
+        items = sorted(value) if isinstance(value, set) else value
+        return (type(value).__name__, tuple(make_key(item) for item in items))
+    return value
+
+
+class ResultCache:
+    '''
+    Bounded, thread-safe LRU cache with an optional time to live, counting hits, misses and evictions.
+    '''
+    def __init__(self, name, max_entries=128, ttl=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key):
+        '''
+        Returns:
+            found (bool): True if the key is cached and not expired.
+            value (Any): Cached value, None when not found.
+        '''
+        with self.lock:
+            if key in self.entries:
+                stored_at, value = self.entries[key]
+                if self.ttl is None or time.monotonic() - stored_at < self.ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self.entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'cache': self.name,
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+def cached_result(max_entries=128, ttl=None):
+    '''
+    Cache the results of a function of the dataset, keyed by the dataset version plus its parameters,
+    so the data itself is never hashed. Like `versioned`, the decorated function takes the version as
+    its first argument and callers omit it. Results are shared between sessions and must not be mutated.
+    The cache and its counters are available as `func.cache` (see ResultCache.stats).
+    Parameters:
+        max_entries (int): Maximum number of results kept, the least recently used are evicted first.
+        ttl (float): Seconds a result is kept, None to keep it until it is evicted.
+    Returns:
+        decorator (function): Decorator for the function.
+    '''
+    def decorator(func):
+        cache = ResultCache(f"{func.__module__}.{func.__name__}", max_entries, ttl)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            version = current_version()
+            key = (version, make_key(args), make_key(kwargs))
+            found, value = cache.get(key)
+            if not found:
+                value = func(version, *args, **kwargs)
+                cache.put(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
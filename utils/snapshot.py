@@ -0,0 +1,131 @@
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Bump this whenever the layout/types of the snapshot change so old files are rebuilt
+SNAPSHOT_VERSION = "9"
+DATASET_DIR = 'files/dataset'
+SNAPSHOT_DIR = os.path.join(DATASET_DIR, 'snapshot')
+
+# The main dataset is stored as one partition per source CSV file (one per year)
+MAIN_PARTITIONS_DIR = os.path.join(SNAPSHOT_DIR, 'main')
+
+# Aggregates precomputed per partition, merged when loaded: <AGGREGATES_DIR>/<aggregate>/<partition>.parquet
+AGGREGATES_DIR = os.path.join(SNAPSHOT_DIR, 'aggregates')
+DISTANCES_SNAPSHOT = os.path.join(SNAPSHOT_DIR, 'distances.parquet')
+WEATHER_SNAPSHOT = os.path.join(SNAPSHOT_DIR, 'weather_capitals.parquet')
+
+
+def snapshot_is_fresh(snapshot_path, source_paths):
+    '''
+    Check if a snapshot can be used instead of re-reading its source files.
+    Parameters:
+        snapshot_path (str): Path of the Parquet snapshot.
+        source_paths (list): CSV files the snapshot was built from.
+    Returns:
+        fresh (bool): True if the snapshot exists, has the current version and is newer than every source.
+    '''
+    if not os.path.exists(snapshot_path):
+        return False
+
+    metadata = pq.read_schema(snapshot_path).metadata or {}
+    if metadata.get(b'nexmove_snapshot_version') != SNAPSHOT_VERSION.encode():
+        return False
+
+    # Sources may be missing in deployments that only ship the snapshot
+    source_mtimes = [os.path.getmtime(path) for path in source_paths if os.path.exists(path)]
+    return not source_mtimes or os.path.getmtime(snapshot_path) >= max(source_mtimes)
+
+
+def write_snapshot(df, snapshot_path):
+    '''
+    Write a DataFrame as a compressed Parquet snapshot, keeping its pandas dtypes.
+    The file is written next to the target and renamed, so readers never see a half-written snapshot.
+    Parameters:
+        df (pd.DataFrame): Typed DataFrame to store.
+        snapshot_path (str): Destination path.
+    '''
+    os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b'nexmove_snapshot_version': SNAPSHOT_VERSION.encode(),
+    })
+    tmp_path = f"{snapshot_path}.tmp"
+    pq.write_table(table, tmp_path, compression='zstd')
+    os.replace(tmp_path, snapshot_path)
+
+
+def read_snapshot(snapshot_path):
+    # Categoricals and datetimes are restored from the pandas metadata stored in the file
+    return pq.read_table(snapshot_path).to_pandas()
+
+
+def partition_path(name):
+    # Snapshot of one partition of the main dataset, e.g. 'full_dataset_extended_2024'
+    return os.path.join(MAIN_PARTITIONS_DIR, f"{name}.parquet")
+
+
+def aggregate_path(aggregate, name):
+    # Aggregate of one partition of the main dataset
+    return os.path.join(AGGREGATES_DIR, aggregate, f"{name}.parquet")
+
+
+def stored_partitions():
+    # Partitions available as snapshots, also when their CSV files are not shipped
+    if not os.path.isdir(MAIN_PARTITIONS_DIR):
+        return []
+    return sorted(file[:-len('.parquet')] for file in os.listdir(MAIN_PARTITIONS_DIR) if file.endswith('.parquet'))
+
+
+def build_snapshots(rebuild=False, show_memory_report=False):
+    '''
+    Incremental ingest: build the snapshot of every main CSV file that is new or changed, and the
+    aggregates of those partitions only. Everything that is already up to date is left untouched.
+    Parameters:
+        rebuild (bool): Rebuild every partition and aggregate, even the fresh ones.
+        show_memory_report (bool): Print the memory footprint of the compact vs the default schema.
+    '''
+    # Imported here to avoid a circular import, helpers uses this module to load the datasets
+    from utils.helpers import (WEATHER_CSV, chat_csv_files, concat_partitions, load_main_partition, load_partition_aggregates,
+                               main_csv_path, main_partition_names, memory_report, read_distances_csv, read_weather_capitals_csv)
+    from utils.cube import CUBE_BUILDERS
+    from utils.pairs import PAIR_BUILDERS
+
+    builders = {**CUBE_BUILDERS, **PAIR_BUILDERS}
+    names = main_partition_names()
+    for name in names:
+        if rebuild or not snapshot_is_fresh(partition_path(name), [main_csv_path(name)]):
+            DATA = load_main_partition(name, rebuild=True)
+            print(f"Partition {name}: {len(DATA):,} rows written to {partition_path(name)}")
+        else:
+            print(f"Partition {name}: up to date")
+
+        built = load_partition_aggregates(name, builders, rebuild=rebuild)[1]
+        if built:
+            print(f"    {len(built)} aggregates rebuilt")
+
+    if rebuild or not snapshot_is_fresh(DISTANCES_SNAPSHOT, chat_csv_files()):
+        distances = read_distances_csv()
+        write_snapshot(distances, DISTANCES_SNAPSHOT)
+        print(f"Snapshot written to {DISTANCES_SNAPSHOT} ({len(distances):,} province pairs from {len(chat_csv_files())} CSV files)")
+
+    if rebuild or not snapshot_is_fresh(WEATHER_SNAPSHOT, [WEATHER_CSV]):
+        weather = read_weather_capitals_csv()
+        write_snapshot(weather, WEATHER_SNAPSHOT)
+        print(f"Snapshot written to {WEATHER_SNAPSHOT} ({len(weather):,} observations of the province capitals)")
+
+    if show_memory_report:
+        print(memory_report(concat_partitions([load_main_partition(name) for name in names])).to_string())
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the Parquet snapshots of the NexMove datasets, only for the new or changed CSV files.")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Rebuild every partition and aggregate, not only the new or changed ones.")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="Print the in-memory footprint of the default vs the compact schema.")
+    args = parser.parse_args()
+    build_snapshots(rebuild=args.rebuild, show_memory_report=args.memory_report)
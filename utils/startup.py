@@ -0,0 +1,77 @@
+import subprocess
+import sys
+import time
+
+# Every page module, which is what app.py used to import before rendering the Home page
+PAGE_MODULES = [
+    'pages.chat',
+    'pages.evolution_days',
+    'pages.evolution_months',
+    'pages.holidays',
+    'pages.maps',
+    'pages.trips',
+    'pages.specific_trips',
+    'pages.weather',
+]
+
+
+# What the pages used to run at import time on top of importing themselves: the chat page read its CSV dataset
+EAGER_STATEMENTS = ['from utils.helpers import load_dataset_chat', 'load_dataset_chat()']
+
+
+def time_import(modules, repeat=3, statements=()):
+    '''
+    Time importing some modules in a fresh interpreter, so nothing is reused from a previous import.
+    Parameters:
+        modules (list): Module names imported one after the other.
+        repeat (int): Number of runs, the fastest one is kept.
+        statements (list): Python statements run after the imports, timed with them.
+    Returns:
+        seconds (float): Wall time of the fastest run, interpreter start included.
+    '''
+    code = "; ".join([*(f"import {module}" for module in modules), *statements])
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-W', 'ignore', '-c', code],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            # Keep the last line of the traceback, e.g. the missing module of an optional dependency
+            lines = result.stderr.strip().splitlines()
+            raise RuntimeError(lines[-1] if lines else f"exit code {result.returncode}")
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def startup_report(repeat=3):
+    '''
+    Compare the import cost of the app entry point with the cost of importing every page up front.
+    Returns:
+        report (dict): Seconds per scenario, or the error of the scenarios that failed.
+    '''
+    scenarios = {
+        'interpreter only': ([], ()),
+        'app (pages loaded on demand)': (['app'], ()),
+        'app + every page (eager imports)': (['app', *PAGE_MODULES], EAGER_STATEMENTS),
+    }
+    report = {}
+    for scenario, (modules, statements) in scenarios.items():
+        try:
+            report[scenario] = time_import(modules, repeat, statements)
+        except RuntimeError as error:
+            report[scenario] = str(error)
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure the import time of the NexMove app at startup.")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per scenario, the fastest one is reported.")
+    args = parser.parse_args()
+
+    for scenario, seconds in startup_report(args.repeat).items():
+        if isinstance(seconds, str):
+            print(f"{scenario:<36} failed: {seconds}")
+        else:
+            print(f"{scenario:<36} {seconds:6.2f} s")
@@ -0,0 +1,282 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.calendar_dim import DAY_OF_WEEK_NAMES, MONTH_NAMES
+from utils.helpers import load_dataset_main
+from utils.versioning import versioned
+
+
+def zone_codes(column, zones):
+    # Position of every row's zone in `zones`, mapped through the categories to avoid a per-row lookup
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return zones.get_indexer(column.cat.categories)[column.cat.codes.to_numpy()]
+    return zones.get_indexer(column)
+
+
+class MobilityTensor:
+    '''
+    Daily travelers between zones (provinces or autonomous communities) stored as a dense
+    NumPy array of shape (days, origins, destinations). Days without a row count as 0.
+    '''
+    def __init__(self, values, days, zones, zone_communities=None):
+        self.values = values
+        self.days = pd.DatetimeIndex(days)
+        self.zones = pd.Index(zones)
+        # Community of each zone, only known at province level
+        self.zone_communities = zone_communities
+
+    @classmethod
+    def from_dataframe(cls, DATA, measure='viajeros'):
+        '''
+        Build the province level tensor from the main dataset.
+        Parameters:
+            DATA (pd.DataFrame): Main dataset.
+            measure (str): Column summed into each cell.
+        Returns:
+            tensor (MobilityTensor): Tensor with one cell per day, origin and destination province.
+        '''
+        zones = pd.Index(sorted(set(DATA['provincia_origen_name'].unique()) | set(DATA['provincia_destino_name'].unique())))
+        days = pd.date_range(DATA['day'].min(), DATA['day'].max(), freq='D')
+
+        day_codes = ((DATA['day'] - days[0]) // pd.Timedelta(days=1)).to_numpy()
+        origin_codes = zone_codes(DATA['provincia_origen_name'], zones)
+        destination_codes = zone_codes(DATA['provincia_destino_name'], zones)
+
+        # One flat cell per row, repeated cells are summed by bincount
+        shape = (len(days), len(zones), len(zones))
+        cells = np.ravel_multi_index((day_codes, origin_codes, destination_codes), shape)
+        values = np.bincount(cells, weights=DATA[measure].to_numpy(), minlength=np.prod(shape))
+        values = values.astype(np.int64).reshape(shape)
+
+        # Each province belongs to a single community, take it from the origin side (or destination if never an origin)
+        communities = pd.concat([
+            DATA[['provincia_origen_name', 'comunidad_origen']].drop_duplicates().set_axis(['province', 'community'], axis=1),
+            DATA[['provincia_destino_name', 'comunidad_destino']].drop_duplicates().set_axis(['province', 'community'], axis=1),
+        ]).astype(str).drop_duplicates('province').set_index('province')['community']
+
+        return cls(values, days, zones, communities.reindex(zones.astype(str)).to_numpy())
+
+    def date_slice(self, start=None, end=None):
+        '''
+        Restrict the tensor to a date range (both ends included). The values are a view, not a copy.
+        Parameters:
+            start (date): First day, defaults to the first day of the tensor.
+            end (date): Last day, defaults to the last day of the tensor.
+        Returns:
+            tensor (MobilityTensor): Tensor for the selected days.
+        '''
+        first = 0 if start is None else self.days.searchsorted(pd.Timestamp(start), side='left')
+        last = len(self.days) if end is None else self.days.searchsorted(pd.Timestamp(end), side='right')
+        return MobilityTensor(self.values[first:last], self.days[first:last], self.zones, self.zone_communities)
+
+    def day_mask(self, mask):
+        '''
+        Keep the days where a boolean mask over `days` is True, e.g. tensor.day_mask(tensor.days.year == 2023).
+        '''
+        return MobilityTensor(self.values[mask], self.days[mask], self.zones, self.zone_communities)
+
+    def origin_totals(self):
+        # (days, origins): travelers leaving each zone every day
+        return self.values.sum(axis=2)
+
+    def destination_totals(self):
+        # (days, destinations): travelers arriving to each zone every day
+        return self.values.sum(axis=1)
+
+    def community_matrix(self):
+        '''
+        Membership matrix between provinces and communities.
+        Returns:
+            communities (pd.Index): Community names.
+            matrix (np.ndarray): (provinces, communities) array with a 1 where the province belongs to the community.
+        '''
+        communities = pd.Index(sorted(set(self.zone_communities)))
+        matrix = np.zeros((len(self.zones), len(communities)), dtype=np.int64)
+        matrix[np.arange(len(self.zones)), communities.get_indexer(self.zone_communities)] = 1
+        return communities, matrix
+
+    def to_communities(self):
+        '''
+        Roll the province tensor up to autonomous communities.
+        Returns:
+            tensor (MobilityTensor): Tensor of shape (days, origin communities, destination communities).
+        '''
+        communities, matrix = self.community_matrix()
+        values = np.einsum('tod,oa,db->tab', self.values, matrix, matrix, optimize=True)
+        return MobilityTensor(values, self.days, communities)
+
+    def daily(self, origin=None, destination=None):
+        '''
+        Daily travelers for an origin and/or destination zone (all zones when not given).
+        Returns:
+            series (pd.Series): Travelers indexed by day.
+        '''
+        values = self.values
+        values = values[:, self.zones.get_loc(origin), :] if origin is not None else values.sum(axis=1)
+        values = values[:, self.zones.get_loc(destination)] if destination is not None else values.sum(axis=1)
+        return pd.Series(values, index=self.days.rename('day'), name='viajeros')
+
+    def by_day_of_week(self, origin=None, destination=None):
+        # Travelers per day of the week (Monday to Sunday) over the days of the tensor
+        day_of_week = pd.Categorical(self.days.day_name(), categories=DAY_OF_WEEK_NAMES, ordered=True)
+        return self.daily(origin, destination).groupby(day_of_week, observed=True).sum().rename_axis('day_of_week')
+
+    def by_day_number(self, origin=None, destination=None):
+        # Travelers per day of the month over the days of the tensor
+        return self.daily(origin, destination).groupby(self.days.day).sum().rename_axis('day_number')
+
+    def destination_frame(self):
+        # Total travelers arriving to each zone, in the layout expected by plot_map
+        totals = self.destination_totals().sum(axis=0)
+        frame = pd.DataFrame({'provincia_destino_name': self.zones, 'viajeros': totals})
+        return frame[frame['viajeros'] > 0].reset_index(drop=True)
+
+    def prefix_index(self, side):
+        '''
+        Build the prefix-sum index of the daily totals of one side of the trips.
+        Parameters:
+            side (str): 'origin' or 'destination'.
+        Returns:
+            index (PrefixIndex): Prefix sums per zone of that side.
+        '''
+        daily = self.origin_totals() if side == 'origin' else self.destination_totals()
+        return PrefixIndex(daily, self.days, self.zones)
+
+    def active_origins(self):
+        # Zones with at least one traveler leaving them in the tensor
+        return list(self.zones[self.origin_totals().sum(axis=0) > 0])
+
+    def active_destinations(self):
+        # Zones with at least one traveler arriving to them in the tensor
+        return list(self.zones[self.destination_totals().sum(axis=0) > 0])
+
+
+class PrefixIndex:
+    '''
+    Cumulative sums of daily travelers per zone over the dense daily axis of a MobilityTensor.
+    The total of any date range is the difference of two rows, and its daily series is a plain slice.
+    '''
+    def __init__(self, daily, days, zones):
+        self.daily = daily
+        self.days = pd.DatetimeIndex(days)
+        self.zones = pd.Index(zones)
+        # Row i holds the total of the first i days, so row 0 is all zeros
+        self.prefix = np.zeros((len(days) + 1, len(zones)), dtype=np.int64)
+        np.cumsum(daily, axis=0, out=self.prefix[1:])
+
+    def _bounds(self, start, end):
+        # The daily axis has no gaps, so a date maps to its row with a subtraction
+        first = (pd.Timestamp(start) - self.days[0]).days
+        last = (pd.Timestamp(end) - self.days[0]).days + 1
+        return min(max(first, 0), len(self.days)), min(max(last, 0), len(self.days))
+
+    def active_zones(self):
+        # Zones with at least one traveler on this side, read from the last row of the prefix sums
+        return list(self.zones[self.prefix[-1] > 0])
+
+    def range_total(self, zone, start, end):
+        '''
+        Total travelers of a zone between two dates (both included).
+        '''
+        first, last = self._bounds(start, end)
+        if first >= last:
+            return 0
+        column = self.zones.get_loc(zone)
+        return int(self.prefix[last, column] - self.prefix[first, column])
+
+    def range_daily(self, zone, start, end):
+        '''
+        Daily travelers of a zone between two dates (both included).
+        Returns:
+            series (pd.Series): Travelers indexed by day.
+        '''
+        first, last = self._bounds(start, end)
+        column = self.zones.get_loc(zone)
+        return pd.Series(self.daily[first:last, column], index=self.days[first:last].rename('day'), name='viajeros')
+
+
+@versioned()
+@st.cache_resource(max_entries=2)
+def load_mobility_tensor(version):
+    # Province tensor, built once per dataset version from the main dataset
+    return MobilityTensor.from_dataframe(load_dataset_main.for_version(version))
+
+
+@versioned()
+@st.cache_resource(max_entries=2)
+def load_community_tensor(version):
+    # Community tensor, rolled up from the province tensor
+    return load_mobility_tensor.for_version(version).to_communities()
+
+
+@versioned(warm=[(level, side) for level in ('province', 'community') for side in ('origin', 'destination')])
+@st.cache_resource(max_entries=8)
+def load_prefix_index(version, level, side):
+    '''
+    Prefix-sum index of daily travelers, built once per dataset version.
+    Parameters:
+        version (str): Dataset version (see utils.versioning), filled in for callers.
+        level (str): 'province' or 'community'.
+        side (str): 'origin' or 'destination'.
+    Returns:
+        index (PrefixIndex): Prefix sums for the requested zones and side.
+    '''
+    tensor = load_mobility_tensor.for_version(version) if level == 'province' else load_community_tensor.for_version(version)
+    return tensor.prefix_index(side)
+
+
+def build_month_index(tensor):
+    '''
+    Split a tensor by month, with the zones offered by the origin and destination dropdowns of each month.
+    Parameters:
+        tensor (MobilityTensor): Province or community tensor.
+    Returns:
+        index (dict): (year, month name) -> (month tensor, origins, destinations). The month tensors are views
+        of `tensor`. The None key holds an empty month, for the months without data.
+    '''
+    # Days are contiguous and sorted, so every month is a run of rows
+    month_numbers = tensor.days.year * 12 + tensor.days.month - 1
+    starts = np.flatnonzero(np.diff(month_numbers, prepend=-1))
+    ends = np.append(starts[1:], len(tensor.days))
+
+    index = {}
+    for start, end in zip(starts, ends):
+        month_tensor = MobilityTensor(tensor.values[start:end], tensor.days[start:end], tensor.zones, tensor.zone_communities)
+        year, month = divmod(int(month_numbers[start]), 12)
+        index[(year, MONTH_NAMES[month])] = (month_tensor, month_tensor.active_origins(), month_tensor.active_destinations())
+
+    empty = MobilityTensor(tensor.values[:0], tensor.days[:0], tensor.zones, tensor.zone_communities)
+    index[None] = (empty, [], [])
+    return index
+
+
+@versioned(warm=[('province',), ('community',)])
+@st.cache_resource(max_entries=4)
+def load_month_index(version, level):
+    # Month index of the province or community tensor, built once per dataset version
+    tensor = load_mobility_tensor.for_version(version) if level == 'province' else load_community_tensor.for_version(version)
+    return build_month_index(tensor)
+
+
+def month_trips(level, year, month):
+    '''
+    Trips of a month, looked up in the month index.
+    Parameters:
+        level (str): 'province' or 'community'.
+        year (int): Year.
+        month (str): Month name.
+    Returns:
+        month_tensor (MobilityTensor): Tensor restricted to the days of the month.
+        origins (list): Zones with travelers leaving them that month.
+        destinations (list): Zones with travelers arriving to them that month.
+    '''
+    index = load_month_index(level)
+    return index.get((int(year), month), index[None])
+
+
+def month_options():
+    # Years and months (in calendar order) with data, for the year and month dropdowns
+    months = [key for key in load_month_index('province') if key is not None]
+    years = sorted({year for year, _ in months})
+    month_names = [month for month in MONTH_NAMES if any(name == month for _, name in months)]
+    return years, month_names
@@ -0,0 +1,144 @@
+import functools
+import hashlib
+import os
+import threading
+import time
+import streamlit as st
+from utils.snapshot import DATASET_DIR, MAIN_PARTITIONS_DIR, stored_partitions
+
+# How often the dataset files are checked for changes, in seconds
+VERSION_CHECK_SECONDS = 30
+
+# Versioned loaders to run for a new version before it is swapped in: (loader, list of argument tuples)
+WARMUPS = []
+
+
+def read_dataset_version():
+    '''
+    Version token of the files under files/dataset: a hash of their names, sizes and modification times.
+    Only the stat of each file is read, so it is cheap enough to check periodically.
+    Returns:
+        version (str): Short hexadecimal token, it changes whenever a dataset file is added, removed or rewritten.
+    '''
+    files = [os.path.join(DATASET_DIR, file) for file in os.listdir(DATASET_DIR)] if os.path.isdir(DATASET_DIR) else []
+    files = [path for path in files if os.path.isfile(path)]
+
+    # Partitions only shipped as snapshots (no CSV file) are part of the data too
+    csv_names = {os.path.basename(path)[:-len('.csv')] for path in files if path.endswith('.csv')}
+    files += [os.path.join(MAIN_PARTITIONS_DIR, f"{name}.parquet") for name in stored_partitions() if name not in csv_names]
+
+    digest = hashlib.sha1()
+    for path in sorted(files):
+        stat = os.stat(path)
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+def warm_up(version):
+    # Fill the caches of every versioned loader for a version, so its first visitors do not wait for it
+    for loader, warm_args in WARMUPS:
+        for args in warm_args:
+            loader(version, *args)
+
+
+class DatasetVersions:
+    '''
+    Version of the dataset served by the process. When the files change, the new version is loaded in a
+    background thread and only becomes active once every versioned cache is filled for it; until then
+    sessions keep being served from the previous one.
+    '''
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = None
+        # Version served before the last swap, sessions pinned to it keep it until their next full run
+        self.previous = None
+        self.loading = None
+        self.checked_at = 0.0
+
+    def refresh(self):
+        '''
+        Check the dataset files (at most every VERSION_CHECK_SECONDS) and start loading a new version if they changed.
+        Returns:
+            version (str): Version to serve now.
+        '''
+        with self.lock:
+            now = time.monotonic()
+            if self.active is not None and now - self.checked_at < VERSION_CHECK_SECONDS:
+                return self.active
+            self.checked_at = now
+
+            latest = read_dataset_version()
+            if self.active is None:
+                # Nothing to serve yet, the first version is loaded by the first caller
+                self.active = latest
+            elif latest not in (self.active, self.loading):
+                self.loading = latest
+                threading.Thread(target=self._load, args=(latest,), daemon=True).start()
+            return self.active
+
+    def _load(self, version):
+        try:
+            warm_up(version)
+        except Exception:
+            # Keep serving the current version, the next check will try again
+            with self.lock:
+                self.loading = None
+            return
+
+        # Swap in the new version in one assignment
+        with self.lock:
+            if self.loading == version:
+                self.previous, self.active = self.active, version
+                self.loading = None
+
+
+@st.cache_resource
+def get_dataset_versions():
+    # One instance per process, shared by every session
+    return DatasetVersions()
+
+
+def pin_dataset_version():
+    '''
+    Pin the version served to the current session for the whole run, so every section of a page reads
+    the same data even if a new version is swapped in meanwhile. Called at the start of every full run.
+    '''
+    st.session_state['dataset_version'] = get_dataset_versions().refresh()
+
+
+def current_version():
+    '''
+    Version pinned for this session, or the active one of the process. The versioned caches only keep the
+    active and the previous version, so a session pinned to an older one is re-pinned to the active version
+    instead of rebuilding an evicted version.
+    Returns:
+        version (str): Version to read the data of.
+    '''
+    versions = get_dataset_versions()
+    active = versions.refresh()
+    pinned = st.session_state.get('dataset_version')
+    if pinned in (active, versions.previous):
+        return pinned
+    st.session_state['dataset_version'] = active
+    return active
+
+
+def versioned(warm=((),)):
+    '''
+    Key a cached loader by the dataset version. The decorated function takes the version as its first
+    argument, callers omit it and get the version of their session. `loader.for_version(version, ...)`
+    calls it for an explicit version, as loaders do between them.
+    Parameters:
+        warm (list): Argument tuples the loader is called with to warm up a new version, empty to skip it.
+    Returns:
+        decorator (function): Decorator for a cached loader.
+    '''
+    def decorator(loader):
+        @functools.wraps(loader)
+        def wrapper(*args, **kwargs):
+            return loader(current_version(), *args, **kwargs)
+
+        wrapper.for_version = loader
+        WARMUPS.append((loader, list(warm)))
+        return wrapper
+    return decorator
@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.provinces import PROVINCE_TABLE, province_coordinates, province_id
+from utils.calendar_dim import MONTH_NAMES, day_key, load_calendar
+from utils.helpers import load_dataset_weather
+from utils.query import TABLE_NAME, query
+from utils.versioning import versioned
+
+# Columns of the per-day frames, as used by the temperature maps
+DAY_COLUMNS = ['desc_provincia', 'latitude', 'longitude', 'tempmax', 'tempmin', 'temp_avg', 'color']
+
+# Weather columns joined to the daily travelers of each province
+JOINED_WEATHER_COLUMNS = ['tempmax', 'tempmin', 'temp', 'preciptype']
+
+# Colour of the capitals without a temperature
+MISSING_COLOR = [128, 128, 128, 160]
+
+
+def temperature_colors(temperatures):
+    '''
+    RGBA colour of each temperature: blue to yellow up to 10°C, yellow to orange up to 20°C, then orange to red.
+    Parameters:
+        temperatures (np.ndarray): Temperatures in °C.
+    Returns:
+        colors (np.ndarray): (n, 4) integer array, one RGBA colour per temperature.
+    '''
+    temperatures = np.asarray(temperatures, dtype=float)
+    colors = np.empty((len(temperatures), 4), dtype=np.int64)
+    colors[:, 3] = 160
+
+    cold = temperatures <= 10
+    mild = (temperatures > 10) & (temperatures <= 20)
+    hot = temperatures > 20
+
+    # Blue to Yellow transition
+    colors[cold, :3] = np.stack([
+        np.zeros(cold.sum()), np.trunc(temperatures[cold] / 10 * 255), np.full(cold.sum(), 255),
+    ], axis=1)
+    # Yellow to Orange transition
+    colors[mild, :3] = np.stack([
+        np.trunc((temperatures[mild] - 10) / 10 * 255), np.full(mild.sum(), 255), np.zeros(mild.sum()),
+    ], axis=1)
+    # Orange to Red transition
+    colors[hot, :3] = np.stack([
+        np.full(hot.sum(), 255), np.trunc((1 - (temperatures[hot] - 20) / 10) * 128), np.zeros(hot.sum()),
+    ], axis=1)
+
+    colors[np.isnan(temperatures)] = MISSING_COLOR
+    return colors
+
+
+def build_weather_index(df_weather):
+    '''
+    Split the weather of the province capitals by day, ready to be drawn on the temperature maps.
+    Parameters:
+        df_weather (pd.DataFrame): Weather of the capitals (see load_dataset_weather).
+    Returns:
+        index (dict): Day (pd.Timestamp) -> DataFrame with the columns of DAY_COLUMNS, one row per capital.
+    '''
+    # Capitals without coordinates cannot be drawn
+    weather = df_weather[['day', 'cod_provincia', 'desc_provincia', 'tempmax', 'tempmin', 'temp']].join(
+        province_coordinates(), on='cod_provincia', how='inner')
+    weather = weather.rename(columns={'temp': 'temp_avg'})
+    weather['color'] = temperature_colors(weather['temp_avg'].to_numpy()).tolist()
+
+    return {
+        pd.Timestamp(day): day_weather[DAY_COLUMNS].reset_index(drop=True)
+        for day, day_weather in weather.groupby('day', sort=True)
+    }
+
+
+@versioned()
+@st.cache_resource(max_entries=2)
+def load_weather_index(version):
+    # Per-day weather of the capitals, built once per dataset version
+    return build_weather_index(load_dataset_weather.for_version(version))
+
+
+def weather_of_day(day):
+    '''
+    Weather of the province capitals on a day, looked up in the per-day index.
+    Parameters:
+        day (date): Day to show.
+    Returns:
+        day_weather (pd.DataFrame): One row per capital (see DAY_COLUMNS), empty when there is no observation.
+    '''
+    return load_weather_index().get(pd.Timestamp(day), pd.DataFrame(columns=DAY_COLUMNS))
+
+
+def build_weather_mobility(daily_travel, df_weather, calendar):
+    '''
+    Join the daily travelers and trips to each province with the weather of its capital on that day.
+    Parameters:
+        daily_travel (pd.DataFrame): 'provincia_destino', 'day', 'viajeros' and 'viajes' per province and day.
+        df_weather (pd.DataFrame): Weather of the capitals (see load_dataset_weather).
+        calendar (pd.DataFrame): Calendar dimension covering the days of `daily_travel` (see load_calendar).
+    Returns:
+        table (dict): Province INE code -> DataFrame sorted by day with 'day', 'day_of_week', 'viajeros', 'viajes'
+        and the weather columns (NaN on days without an observation).
+    '''
+    weather = (
+        df_weather[['cod_provincia', 'day', *JOINED_WEATHER_COLUMNS]]
+        .drop_duplicates(['cod_provincia', 'day'])
+        .rename(columns={'cod_provincia': 'provincia_destino'})
+    )
+    joined = daily_travel.merge(weather, on=['provincia_destino', 'day'], how='left')
+    joined['day_of_week'] = calendar['day_of_week'].reindex(day_key(joined['day'])).array
+
+    columns = ['day', 'day_of_week', 'viajeros', 'viajes', *JOINED_WEATHER_COLUMNS]
+    return {
+        int(province): province_days.sort_values('day')[columns].reset_index(drop=True)
+        for province, province_days in joined.groupby('provincia_destino', sort=False)
+    }
+
+
+@versioned()
+@st.cache_resource(max_entries=2)
+def load_weather_mobility(version):
+    # Daily travelers to every province joined with its weather, built once per dataset version
+    daily_travel = query(
+        f'SELECT "provincia_destino", "day", SUM("viajeros")::BIGINT AS viajeros, SUM("viajes")::BIGINT AS viajes '
+        f'FROM {TABLE_NAME} GROUP BY "provincia_destino", "day"',
+        version=version,
+    )
+    return build_weather_mobility(daily_travel, load_dataset_weather.for_version(version), load_calendar.for_version(version))
+
+
+def weather_mobility_provinces():
+    # Names of the provinces in the joined table, for the province dropdown
+    return sorted(PROVINCE_TABLE['name'].reindex(list(load_weather_mobility())).dropna())
+
+
+def weather_mobility_month(province, year, month):
+    '''
+    Daily travelers to a province with the weather of its capital, for one month.
+    Parameters:
+        province (str): Destination province.
+        year (int): Year.
+        month (str): Month name, e.g. 'May'.
+    Returns:
+        month_table (pd.DataFrame): Rows of the month from the joined table, sorted by day.
+    '''
+    province_days = load_weather_mobility().get(province_id(province))
+    if province_days is None:
+        return pd.DataFrame(columns=['day', 'day_of_week', 'viajeros', 'viajes', *JOINED_WEATHER_COLUMNS])
+
+    # Days are sorted, so the month is a contiguous slice
+    start = pd.Timestamp(int(year), MONTH_NAMES.index(month) + 1, 1)
+    first, last = province_days['day'].searchsorted([start, start + pd.offsets.MonthBegin(1)])
+    return province_days.iloc[first:last]